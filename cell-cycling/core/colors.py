@@ -1,5 +1,6 @@
 import plotly
-from typing import Tuple, Union
+from functools import lru_cache
+from typing import List, Tuple, Union
 from palettable.cartocolors.cartocolorspalette import CartoColorsMap
 from colorsys import rgb_to_hsv, rgb_to_hls, hsv_to_rgb, hls_to_rgb
 
@@ -114,9 +115,11 @@ def get_basecolor(palette: CartoColorsMap, index: int) -> ColorRGB:
     return ColorRGB(color[0], color[1], color[2])
 
 
+@lru_cache(maxsize=256)
 def RGB_to_HEX(r: int, g: int, b: int) -> str:
     """
-    Returns the HEX representation of a given RGB color
+    Returns the HEX representation of a given RGB color. The result is cached so that the
+    colors of the experiments are not formatted again at every rerun.
 
     Arguments
     ---------
@@ -136,9 +139,42 @@ def RGB_to_HEX(r: int, g: int, b: int) -> str:
     return "#%02x%02x%02x" % (r, g, b)
 
 
+@lru_cache(maxsize=256)
+def get_HEX_shades(
+    rgb: Tuple[int, int, int], levels: int, reversed: bool = True
+) -> Tuple[str]:
+    """
+    Returns the HEX representation of all the shades generated, for a given number of
+    levels, from a base RGB color (see ColorRGB.get_shade). The result is cached so that
+    the palette of each experiment is computed only once.
+
+    Arguments
+    ---------
+        rgb : Tuple[int, int, int]
+            the values associated to the red, green and blue channels of the base color
+        levels : int
+            the number of shade levels expected
+        reversed : bool
+            if set to True the color will be lighter the higher the value of index else
+            the color will be darker for higher values of index
+
+    Returns
+    -------
+        Tuple[str]
+            the tuple of HEX colors associated to each shade index
+    """
+    color = ColorRGB(*rgb)
+    return tuple(
+        RGB_to_HEX(*color.get_shade(index, levels, reversed=reversed))
+        for index in range(levels)
+    )
+
+
+@lru_cache(maxsize=256)
 def HEX_to_RGB(value: str) -> Tuple[int, int, int]:
     """
-    Returns the tuple of integer RGB values associated to a given HEX sting
+    Returns the tuple of integer RGB values associated to a given HEX sting. The result is
+    cached so that the colors of the experiments are not parsed again at every rerun.
 
     Arguments
     ---------
@@ -152,10 +188,39 @@ def HEX_to_RGB(value: str) -> Tuple[int, int, int]:
     """
     value = value.lstrip("#")
     lv = len(value)
+
+    # Decode the usual 6 digits representation with a single integer conversion
+    if lv == 6:
+        code = int(value, 16)
+        return (code >> 16) & 0xFF, (code >> 8) & 0xFF, code & 0xFF
+
     return tuple(int(value[i : i + lv // 3], 16) for i in range(0, lv, lv // 3))
 
 
+# Tuple of the HEX colors of the default plotly qualitative palette
+PLOTLY_PALETTE: Tuple[str] = tuple(plotly.colors.qualitative.Plotly)
+
+
 def get_plotly_color(index: int) -> str:
-    color_list = plotly.colors.qualitative.Plotly
-    return color_list[index % len(color_list)]
+    return PLOTLY_PALETTE[index % len(PLOTLY_PALETTE)]
+
+
+def get_plotly_colors(start: int, number: int) -> List[str]:
+    """
+    Returns a sequence of consecutive colors of the default plotly palette
+
+    Arguments
+    ---------
+        start : int
+            the index of the first color, the sequence automatically loops around to the
+            first color of the palette
+        number : int
+            the number of colors to return
+
+    Returns
+    -------
+        List[str]
+            the list of HEX colors
+    """
+    return [PLOTLY_PALETTE[(start + i) % len(PLOTLY_PALETTE)] for i in range(number)]
 
@@ -0,0 +1,113 @@
+import numpy as np
+from typing import Tuple
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsample a data series using the Largest-Triangle-Three-Buckets algorithm. The points
+    between the first and the last one are divided in n_out-2 buckets and, from each bucket,
+    the point forming the largest triangle with the point selected in the previous bucket and
+    the average point of the following bucket is kept.
+
+    Arguments
+    ---------
+        x : np.ndarray
+            the x values of the series
+        y : np.ndarray
+            the y values of the series
+        n_out : int
+            the number of points to be kept in the downsampled series. If greater or equal
+            to the length of the series (or smaller than 3) the series is returned unchanged
+
+    Returns
+    -------
+        Tuple[np.ndarray, np.ndarray]
+            the x and y values of the downsampled series
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+    size = len(x)
+    if n_out >= size or n_out < 3:
+        return x, y
+
+    # Compute the boundaries of the n_out-2 buckets excluding the first and the last point
+    edges = np.linspace(1, size - 1, n_out - 1).astype(np.int64)
+
+    # Compute the average point of each bucket, the last point of the series is used as the
+    # average point following the last bucket
+    counts = np.diff(edges)
+    x_avg = np.append(np.add.reduceat(x[: size - 1], edges[:-1]) / counts, x[-1])
+    y_avg = np.append(np.add.reduceat(y[: size - 1], edges[:-1]) / counts, y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, size - 1
+
+    selected = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        xa, ya = x[selected], y[selected]
+        xc, yc = x_avg[bucket + 1], y_avg[bucket + 1]
+
+        # Twice the area of the triangle defined by the selected, candidate and average points
+        area = np.abs((xa - xc) * (y[start:stop] - ya) - (xa - x[start:stop]) * (yc - ya))
+
+        selected = start + int(area.argmax())
+        indices[bucket + 1] = selected
+
+    return x[indices], y[indices]
+
+
+def m4_aggregate(
+    x: np.ndarray, y: np.ndarray, width_px: int = 1200
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsample a data series with monotonically increasing x values using the M4
+    aggregation. The x range is divided in width_px columns (one for each pixel of the
+    plot) and, from each column, the first, last, minimum and maximum points are kept so
+    that the line drawn on screen matches the one of the full series.
+
+    Arguments
+    ---------
+        x : np.ndarray
+            the monotonically increasing x values of the series
+        y : np.ndarray
+            the y values of the series
+        width_px : int
+            the number of pixel columns in which the x range is divided. If the series has
+            less than 4*width_px points it is returned unchanged
+
+    Returns
+    -------
+        Tuple[np.ndarray, np.ndarray]
+            the x and y values of the downsampled series
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+    size = len(x)
+    if size <= 4 * width_px or x[-1] <= x[0]:
+        return x, y
+
+    # Assign each point to a pixel column, being x sorted each column is a contiguous block
+    edges = np.linspace(x[0], x[-1], width_px + 1)
+    columns = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, width_px - 1)
+
+    # Compute the index of the first and last point of each non-empty column
+    first = np.flatnonzero(np.diff(columns, prepend=-1))
+    last = np.append(first[1:] - 1, size - 1)
+    counts = last - first + 1
+
+    # Find the position of the minimum and maximum of each column as the first point in
+    # the column matching the column extreme
+    def column_extreme(ufunc: np.ufunc) -> np.ndarray:
+        extreme = np.repeat(ufunc.reduceat(y, first), counts)
+        matches = np.flatnonzero(y == extreme)
+        _, position = np.unique(columns[matches], return_index=True)
+        return matches[position]
+
+    indices = np.unique(
+        np.concatenate(
+            [first, last, column_extreme(np.minimum), column_extreme(np.maximum)]
+        )
+    )
+
+    return x[indices], y[indices]
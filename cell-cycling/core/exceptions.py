@@ -53,4 +53,14 @@ class DuplicateName(Exception):
         self.name = name
 
     def __str__(self) -> str:
-        return f"""The experiment name '{self.name}' is already used."""
\ No newline at end of file
+        return f"""The experiment name '{self.name}' is already used."""
+
+
+class UnsupportedSessionFile(Exception):
+    """
+    Exception rised when a session file has been saved by a previous, incompatible,
+    version of the program.
+    """
+
+    def __str__(self) -> str:
+        return "The session file has been saved by an incompatible program version."
@@ -1,5 +1,8 @@
 from __future__ import annotations
 import streamlit as st
+import pandas as pd
+from uuid import uuid4
+from hashlib import blake2b
 from io import BytesIO
 from os.path import splitext
 from typing import List, Tuple
@@ -11,10 +14,85 @@ from echemsuite.cellcycling.read_input import FileManager, Instrument
 from echemsuite.cellcycling.cycles import Cycle, CellCycling
 
 
+# Set of the byte values not representing an ASCII character
+NON_ASCII_BYTES = bytes(range(128, 256))
+
 if "__EXPERIMENT_INIT_COUNTER__" not in st.session_state:
         st.session_state["__EXPERIMENT_INIT_COUNTER__"] = 0
 
 
+def get_files_signature(uploaded_files: list) -> Tuple[Tuple[str, int, bytes]]:
+    """
+    Computes a signature of a list of uploaded files that can be used as a cache key
+
+    Arguments
+    ---------
+        uploaded_files :  list
+            list of streamlit UploadedFile objects
+
+    Returns
+    -------
+        Tuple[Tuple[str, int, bytes]]
+            tuple containing, for each file, the name, the size and the blake2b digest of
+            the content
+    """
+    signature = []
+    for file in uploaded_files:
+        # Hash the content through a view of the file buffer to avoid copying it
+        with file.getbuffer() as content:
+            digest = blake2b(content, digest_size=16).digest()
+            signature.append((file.name, content.nbytes, digest))
+
+    return tuple(signature)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def parse_files(
+    files_signature: Tuple[Tuple[str, int, bytes]], extension: str, _uploaded_files: list
+) -> FileManager:
+    """
+    Creates a FileManager object and parses the uploaded files. The function is cached by
+    streamlit based on the signature of the files so that uploading again the same files
+    does not trigger a new parsing. Every call returns an independent copy of the file
+    manager.
+
+    Arguments
+    ---------
+        files_signature : Tuple[Tuple[str, int, bytes]]
+            the signature of the uploaded files (see get_files_signature)
+        extension : str
+            the lowercase extension of the uploaded files (either ".dta" or ".mpt")
+        _uploaded_files :  list
+            list of streamlit UploadedFile objects to be parsed (not hashed)
+
+    Returns
+    -------
+        FileManager
+            the file manager object containing the parsed data
+    """
+    manager = FileManager(verbose=False)
+
+    if extension == ".dta":
+        manager._instrument = Instrument.GAMRY
+    elif extension == ".mpt":
+        manager._instrument = Instrument.BIOLOGIC
+    else:
+        raise UnknownExtension(extension)
+
+    # Load the files in the BytesIO stream buffer of the FileManager keeping only the ASCII
+    # characters. The non-ASCII bytes are deleted directly from the raw buffer without
+    # decoding it (every byte of a non-ASCII UTF-8 character is greater than 127)
+    bytestreams = {}
+    for file in _uploaded_files:
+        content = file.getvalue().translate(None, NON_ASCII_BYTES)
+        bytestreams[file.name] = BytesIO(content)
+
+    manager.bytestreams = bytestreams
+    manager.parse()
+
+    return manager
+
+
 class Experiment:
     """
     Class devoted to describe an experiment and its properties in the GUI.
@@ -50,38 +128,43 @@ class Experiment:
             computation of surface related properties
         _skipped_files : int
             counter of the number of files skipped during the parsing process
+        _revision : str
+            univocal key identifying the current status of the cycle based objects. The key
+            is regenerated every time the cycles are rebuilt and can be used as cache key.
+        _cycles_by_number : Dict[int, Cycle]
+            dictionary mapping the number of each cycle to the corresponding cycle object.
+            The dictionary is rebuilt together with the cycles.
+        _cycle_numbers : Tuple[int]
+            tuple containing the number of each cycle (hidden or not) in order. The tuple is
+            rebuilt together with the cycles.
+        _n_hidden_cycles : int
+            number of hidden cycles. The counter is updated together with the cycles.
+        _files_frame : pd.DataFrame
+            buffer holding the table of the parsed halfcycle files. The buffer is cleared
+            every time a file is added or removed (None is used to request a new table).
+        _parsed_files : List[str]
+            buffer holding the names of the parsed files (see get_parsed_files). The buffer
+            is cleared every time a file is added or removed.
 
     """
 
     def __init__(self, uploaded_files: list) -> None:
 
-        # Initialize FileManager class object
-        self._manager = FileManager(verbose=False)
-
         # Determine the extension of the uploaded files
         extensions = [splitext(file.name)[1] for file in uploaded_files]
 
-        # Check if all the extension match and determine the type of instrument
+        # Check if all the extension match and that the type of instrument is known
         if extensions.count(extensions[0]) != len(extensions):
             raise MultipleExtensions(extensions)
 
-        if extensions[0].lower() == ".dta":
-            self._manager._instrument = Instrument.GAMRY
-        elif extensions[0].lower() == ".mpt":
-            self._manager._instrument = Instrument.BIOLOGIC
-        else:
+        if extensions[0].lower() not in [".dta", ".mpt"]:
             raise UnknownExtension(extensions[0])
 
-        # Load the files in the BytesIO stream buffer of the internal FileManager class
-        bytestreams = {}
-        for file in uploaded_files:
-            original = BytesIO(file.getvalue())
-            decoded = original.read().decode("utf-8", errors="ignore")
-            unicode_text = "".join([char for char in decoded if ord(char) < 128])
-            bytestreams[file.name] = BytesIO(unicode_text.encode("utf-8"))
-
-        self._manager.bytestreams = bytestreams
-        self._manager.parse()
+        # Get the FileManager class object containing the parsed files (the parsing is
+        # skipped if the same files have already been parsed)
+        self._manager = parse_files(
+            get_files_signature(uploaded_files), extensions[0].lower(), uploaded_files
+        )
 
         # Set the file ordering according to the one suggested by the FileManager
         self._ordering = self._manager.suggest_ordering()
@@ -93,8 +176,15 @@ class Experiment:
         # Create a buffer for the cycle based objects
         self._cycles = None
         self._cellcycling = None
+        self._revision = None
+        self._cycles_by_number = {}
+        self._cycle_numbers = ()
+        self._n_hidden_cycles = 0
         self._update_cycles_based_objects()
 
+        # Create the buffers for the table and the names of the parsed files
+        self._clear_files_buffers()
+
         # Get univocal ID based on the number of object constructed
         self._id = st.session_state["__EXPERIMENT_INIT_COUNTER__"]
         st.session_state["__EXPERIMENT_INIT_COUNTER__"] += 1
@@ -110,10 +200,18 @@ class Experiment:
         self._area = None  # Volume of the electrolite in liters
         self._skipped_files = 0
 
+    def _clear_files_buffers(self) -> None:
+        self._files_frame = None
+        self._parsed_files = None
+
     def _update_cycles_based_objects(self) -> None:
         self._cycles = self._manager.get_cycles(self._ordering, self._clean)
         self._cellcycling = CellCycling(self._cycles)
         self._cellcycling.hide(self._manual_hide)
+        self._cycles_by_number = {cycle.number: cycle for cycle in self._cycles}
+        self._cycle_numbers = tuple(self._cycles_by_number)
+        self._n_hidden_cycles = sum(1 for cycle in self._cycles if cycle._hidden)
+        self._revision = uuid4().hex
 
     def __iadd__(self, source: Experiment):
         """
@@ -134,6 +232,7 @@ class Experiment:
         # Parse the buffer to update all data
         self._manager.parse()
         self._update_cycles_based_objects()
+        self._clear_files_buffers()
         return self
 
     def remove_file(self, filename: str) -> None:
@@ -146,11 +245,12 @@ class Experiment:
                 filename of the file to remove
         """
         # Check that the required file to be removed is actually present
-        if filename in self._manager.bytestreams.keys():
+        if filename in self._manager.bytestreams:
             del self._manager.bytestreams[filename]
             self._manager.parse()
             self._ordering = self._manager.suggest_ordering()
             self._update_cycles_based_objects()
+            self._clear_files_buffers()
         else:
             raise ValueError
 
@@ -171,6 +271,7 @@ class Experiment:
         """
         # Append the bytestream to the corresponding buffer
         self._manager.bytestreams[filename] = bytestream
+        self._clear_files_buffers()
         if autoparse:
             self._manager.parse()
             self._update_cycles_based_objects()
@@ -183,6 +284,47 @@ class Experiment:
         self._manual_hide = []
         self._update_cycles_based_objects()
 
+    def get_cycle(self, number: int) -> Cycle:
+        """
+        Returns the cycle (hidden or not) associated to a given cycle number
+
+        Arguments
+        ---------
+            number : int
+                the number of the cycle to return
+        """
+        if number not in self._cycles_by_number:
+            raise ValueError(f"Cycle {number} not found in experiment {self._name}")
+
+        return self._cycles_by_number[number]
+
+    def get_parsed_files(self) -> List[str]:
+        """
+        Returns the list of the uploaded files from which at least one halfcycle has been
+        parsed. For GAMRY files the halfcycles are named after the file while for BIOLOGIC
+        files the name of each halfcycle contains the name of the originating file. The
+        list is computed once and kept until a file is added or removed.
+
+        Returns
+        -------
+            List[str]
+                the names of the parsed files in order of upload
+        """
+        if self._parsed_files is None:
+            halfcycles = self._manager.halfcycles
+            file_names = self.file_names
+
+            if self._manager.instrument == "GAMRY":
+                self._parsed_files = [name for name in file_names if name in halfcycles]
+
+            # Join all the halfcycle names in a single string so that each file name is
+            # searched in all of them with a single substring search
+            else:
+                names = "\0".join(halfcycles)
+                self._parsed_files = [name for name in file_names if name in names]
+
+        return list(self._parsed_files)
+
     @property
     def name(self) -> str:
         """
@@ -245,6 +387,13 @@ class Experiment:
         """
         self._base_color = color
 
+    @property
+    def revision(self) -> str:
+        """
+        getter of the key identifying the current status of the cycle based objects
+        """
+        return self._revision
+
     @property
     def manager(self) -> FileManager:
         """
@@ -265,21 +414,20 @@ class Experiment:
         setter of the ordering list
         """
 
-        # generate a list containing all the files in the ordering list
-        filelist = []
-        for level in new_ordering:
-            for name in level:
-                filelist.append(name)
+        # generate a list and a set containing all the files in the ordering list
+        filelist = [name for level in new_ordering for name in level]
+        fileset = set(filelist)
+        halfcycles = self._manager._halfcycles
 
         # verify that all the files in the current halfcycle buffer matches the one loaded
-        for key in self._manager._halfcycles.keys():
-            if key not in filelist:
+        for key in halfcycles:
+            if key not in fileset:
                 print(f"The file {key} is missing from the new ordering")
                 raise RuntimeError
 
         # verify that all the files in the given list match the one in the halfcycle buffer
         for name in filelist:
-            if name not in self._manager._halfcycles.keys():
+            if name not in halfcycles:
                 raise RuntimeError
 
         # save the given ordering
@@ -310,6 +458,46 @@ class Experiment:
         """
         return [cycle for cycle in self._cycles if cycle._hidden is False]
 
+    @property
+    def cycle_numbers(self) -> Tuple[int]:
+        """
+        getter of the tuple containing the number of each cycle (hidden or not)
+        """
+        return self._cycle_numbers
+
+    @property
+    def n_hidden_cycles(self) -> int:
+        """
+        getter of the number of hidden cycles
+        """
+        return self._n_hidden_cycles
+
+    @property
+    def file_names(self) -> Tuple[str]:
+        """
+        getter of the tuple containing the names of the uploaded files in order of upload
+        """
+        return tuple(self._manager.bytestreams)
+
+    @property
+    def files_frame(self) -> pd.DataFrame:
+        """
+        getter of the table, indexed by filename, listing the timestamp, the type and the
+        runtime of each parsed halfcycle file. The table is built once and kept until a file
+        is added or removed.
+        """
+        if self._files_frame is None:
+            halfcycles = self._manager.halfcycles
+            self._files_frame = pd.DataFrame(
+                {
+                    "timestamp": [hc.timestamp for hc in halfcycles.values()],
+                    "type": [hc.halfcycle_type for hc in halfcycles.values()],
+                    "runtime": [hc.time.iat[-1] for hc in halfcycles.values()],
+                },
+                index=pd.Index(list(halfcycles), name="filename"),
+            )
+        return self._files_frame
+
     @property
     def cellcycling(self) -> CellCycling:
         """
@@ -387,6 +575,14 @@ class ExperimentContainer:
         else:
             raise RuntimeError
 
+    def replace_experiment(
+        self, experiment: Experiment, new_experiment: Experiment
+    ) -> None:
+        for index, obj in enumerate(self._experiments):
+            if obj is experiment:
+                self._experiments[index] = new_experiment
+                self._update_capacity_retention()
+
     def remove_experiment(self, name: str) -> None:
         if name in [obj.name for obj in self._experiments]:
             id = [obj.name for obj in self._experiments].index(name)
@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 import math
 import streamlit as st
-from typing import List, Union, Dict
+from typing import Iterable, List, Tuple, Union, Dict
 
 from core.experiment import Experiment
 from core.exceptions import DuplicateName
@@ -15,12 +15,27 @@ class ProgramStatus:
     ----------
         _experiments : List[Experiment]
             list of all the loaded experiments
+        _version : int
+            counter incremented every time an experiment is added, removed, replaced or
+            renamed
+        _experiment_map : Dict[str, Experiment]
+            buffer holding the name to experiment mapping computed at version
+            _experiment_map_version
+        _index_map : Dict[str, int]
+            buffer holding the name to index mapping computed at version _index_map_version
     """
 
     def __init__(self) -> None:
         # Set the experiment list as empty by default
         self._experiments: List[Experiment] = []
 
+        # Set the version counter and the buffer of the name to experiment mapping
+        self._version: int = 0
+        self._experiment_map: Dict[str, Experiment] = {}
+        self._experiment_map_version: int = None
+        self._index_map: Dict[str, int] = {}
+        self._index_map_version: int = None
+
     def __getitem__(self, index: int) -> Experiment:
         """
         Returns the experiment corresponding to a given index
@@ -38,6 +53,7 @@ class ProgramStatus:
         if type(value) != Experiment:
             raise TypeError
         self._experiments[index] = value
+        self._version += 1
 
     def __iter__(self) -> Experiment:
         """
@@ -65,7 +81,8 @@ class ProgramStatus:
 
     def get_index_of(self, name: str) -> int:
         """
-        Returns the index of the experiment marked with a given name
+        Returns the index of the experiment marked with a given name. The name to index
+        mapping is rebuilt only when the version of the status changes.
 
         Arguments
         ---------
@@ -77,7 +94,44 @@ class ProgramStatus:
             int
                 the index of the experiment in the experiment buffer
         """
-        return self.get_experiment_names().index(name)
+        if self._index_map_version != self._version:
+            self._index_map = {obj.name: i for i, obj in enumerate(self._experiments)}
+            self._index_map_version = self._version
+
+        if name not in self._index_map:
+            raise ValueError(f"'{name}' is not in the experiment buffer")
+
+        return self._index_map[name]
+
+    def get_experiment_map(self) -> Dict[str, Experiment]:
+        """
+        Returns a dictionary mapping the name of each experiment to the experiment object.
+        The dictionary is rebuilt only when the version of the status changes.
+
+        Returns
+        -------
+            Dict[str, Experiment]
+                dictionary mapping the name of each experiment to the experiment object
+        """
+        if self._experiment_map_version != self._version:
+            self._experiment_map = {obj.name: obj for obj in self._experiments}
+            self._experiment_map_version = self._version
+
+        return self._experiment_map
+
+    def rename_experiment(self, name: str, new_name: str) -> None:
+        """
+        Rename an experiment given its current name
+
+        Arguments
+        ---------
+            name : str
+                the current name of the experiment
+            new_name : str
+                the new name to be assigned to the experiment
+        """
+        self._experiments[self.get_index_of(name)].name = new_name
+        self._version += 1
 
     def append_experiment(self, experiment: Experiment) -> None:
         """
@@ -99,6 +153,27 @@ class ProgramStatus:
             raise DuplicateName
 
         self._experiments.append(experiment)
+        self._version += 1
+
+    def replace_experiment(
+        self, experiment: Experiment, new_experiment: Experiment
+    ) -> None:
+        """
+        Replace an experiment object of the buffer with a new one
+
+        Arguments
+        ---------
+            experiment : Experiment
+                the experiment object to be replaced
+            new_experiment : Experiment
+                the experiment object to be stored in its place
+        """
+        for index, obj in enumerate(self._experiments):
+            if obj is experiment:
+                self[index] = new_experiment
+                return
+
+        raise ValueError(f"'{experiment.name}' is not in the experiment buffer")
 
     def remove_experiment(self, index: int):
         """
@@ -112,6 +187,14 @@ class ProgramStatus:
         if index >= len(self._experiments) or index < 0:
             raise ValueError
         del self._experiments[index]
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        """
+        Version counter of the experiment buffer
+        """
+        return self._version
 
     @property
     def number_of_experiments(self):
@@ -169,7 +252,7 @@ class ExperimentSelector:
     def set(
         self,
         name: str,
-        cycles: Union[List[int], None] = None,
+        cycles: Union[Iterable[int], None] = None,
         labels: Union[List[str], None] = None,
     ) -> None:
         """
@@ -179,10 +262,10 @@ class ExperimentSelector:
         ---------
             name : str
                 the name of the experiment
-            cycles : Union[List[int], None]
+            cycles : Union[Iterable[int], None]
                 if set to None will automatially trigger the inclusion of all the cycles
-                available in the experiment. If equal to a list of integers, set the cycles
-                list to the given one.
+                available in the experiment. If equal to a list (or any re-iterable object
+                such as a range) of integers, set the cycles list to the given one.
             labels : Union[List[str], None]
                 if set to None will automatically provide a list of default labels. If equal
                 to a list of stings, sets the label associated to each series.
@@ -195,23 +278,20 @@ class ExperimentSelector:
         if name not in status.get_experiment_names():
             raise ValueError
 
-        # Get the index of the experiment in the status memory
-        id = status.get_index_of(name)
-        id_ordering = status[id].ordering
+        # Get the numbers of the cycles of the experiment (the same used by get_cycle)
+        cycle_numbers = status.get_experiment_map()[name].cycle_numbers
+
         # If cycles is None include all the available cycles in the experiment
         if cycles is None:
-            cycle_list = status[id].manager.get_cycles(id_ordering)
-            stride = int(math.ceil(len(cycle_list) / 10))
-            cycles = [
-                cycle.number for idx, cycle in enumerate(cycle_list) if idx % stride == 0
-            ]
+            stride = max(1, int(math.ceil(len(cycle_numbers) / 10)))
+            cycles = list(cycle_numbers[::stride])
 
-        # Else, check that all the given cycle index ar valid
+        # Else, check that all the given cycle numbers are valid
         else:
+            available_numbers = set(cycle_numbers)
             for number in cycles:
-                number_of_cycles = len(status[id].manager.get_cycles(id_ordering))
-                if number < 0 or number >= number_of_cycles:
-                    raise ValueError(f"Cycle index {number} must be non negative and smaller than {number_of_cycles}")
+                if number not in available_numbers:
+                    raise ValueError(f"Cycle {number} not found in experiment {name}")
 
         # If labels are provided check that the list length match and apply the given labels
         if labels is not None:
@@ -305,7 +385,7 @@ class ExperimentSelector:
             name : str
                 the name of the experiment
         """
-        if name not in self.view.keys():
+        if name not in self.view:
             raise ValueError
 
         for obj in self.view[name]:
@@ -373,15 +453,15 @@ class SingleCycleSeries:
     color_from_base: bool = False
 
 
-@dataclass
+@dataclass(frozen=True)
 class StackedPlotSettings:
 
     x_axis: str = None
     y_axis: str = None
     x_autorange: bool = True
     y_autorange: bool = True
-    x_range: List[float] = None
-    y_range: List[float] = None
+    x_range: Tuple[float, float] = None
+    y_range: Tuple[float, float] = None
     custom_x_dticks: bool = False
     custom_y_dticks: bool = False
     x_dtick: float = None
@@ -391,6 +471,7 @@ class StackedPlotSettings:
     scale_by_area: bool = False
     show_charge: bool = True
     show_discharge: bool = True
+    downsample: bool = True
     reverse: bool = False
     font_size: int = 24
     axis_font_size: int = 32
@@ -399,7 +480,7 @@ class StackedPlotSettings:
     total_width: int = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class ComparisonPlotSettings:
 
     x_axis: str = None
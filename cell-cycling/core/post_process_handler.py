@@ -8,9 +8,8 @@ def update_experiment_name(old: str, new: str) -> None:
 
     if "Page2_CyclePlotSelection" in st.session_state:
         exp_selector: ExperimentSelector = st.session_state["Page2_CyclePlotSelection"]
-        for name in list(exp_selector.view.keys()):
-            if name == old:
-                exp_selector.view[new] = exp_selector.view.pop(old)
+        if old in exp_selector.view:
+            exp_selector.view[new] = exp_selector.view.pop(old)
 
     if "Page2_ComparisonPlot" in st.session_state:
         selected_series: List[SingleCycleSeries] = st.session_state["Page2_ComparisonPlot"]
@@ -23,9 +22,8 @@ def remove_experiment_entries(old: str) -> None:
 
     if "Page2_CyclePlotSelection" in st.session_state:
         exp_selector: ExperimentSelector = st.session_state["Page2_CyclePlotSelection"]
-        for name in list(exp_selector.view.keys()):
-            if name == old:
-                del exp_selector.view[old]
+        if old in exp_selector.view:
+            del exp_selector.view[old]
 
     if "Page2_ComparisonPlot" in st.session_state:
         selected_series: List[SingleCycleSeries] = st.session_state["Page2_ComparisonPlot"]
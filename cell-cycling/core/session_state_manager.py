@@ -1,23 +1,70 @@
 from io import BytesIO
-from copy import deepcopy
 
-import pickle
-from typing import List
+import glob, os, pickle, re, secrets, struct, time
+from hashlib import blake2b
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, List, Tuple
 import streamlit as st
 
+from core.exceptions import UnsupportedSessionFile
+
+# Header identifying the session files in which the large binary buffers (e.g. the numpy
+# arrays of the experiment dataframes) are stored out-of-band after the pickle payload
+OUT_OF_BAND_HEADER = b"GESOOB01"
+
+# Single worker thread used to write the checkpoint files without blocking the script,
+# a single worker keeps the writes of the same checkpoint in order
+_CHECKPOINT_EXECUTOR = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="session_checkpoint"
+)
+
+# Prefix of the session checkpoint files, pattern of the secret keys identifying them
+# and maximum age (in seconds) after which the checkpoints are removed
+CHECKPOINT_PREFIX = "GES_checkpoint_"
+CHECKPOINT_KEY_PATTERN = "[A-Za-z0-9_-]{43}"
+CHECKPOINT_MAX_AGE = 24 * 3600
+
 
 def generate_session_state_model(keys: List[str]):
+    # The values are not copied since they are serialized immediately by the caller
     buffer = {}
     for key in keys:
         if key in st.session_state:
-            buffer[key] = deepcopy(st.session_state[key])
+            buffer[key] = st.session_state[key]
     return buffer
 
 
-def save_session_state():
+def _dump(obj: object) -> Tuple[bytes, List[pickle.PickleBuffer]]:
+    """
+    Serializes an object using the pickle protocol 5 collecting the binary buffers
+    supporting it out-of-band so that they are not copied in the pickle payload.
 
-    bytestream = BytesIO()
+    Arguments
+    ---------
+        obj : object
+            the object to serialize
 
+    Returns
+    -------
+        Tuple[bytes, List[pickle.PickleBuffer]]
+            the pickle payload and the list of out-of-band buffers
+    """
+    buffers = []
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    return payload, buffers
+
+
+def _serialize_session_state() -> Tuple[bytes, List[memoryview]]:
+    """
+    Serializes the session state entries to be saved (see _dump). The large binary
+    buffers are collected by reference so that the call is cheap and the only expensive
+    step, the copy of the buffers to the destination, is left to _write_session_state.
+
+    Returns
+    -------
+        Tuple[bytes, List[memoryview]]
+            the pickle payload and the views of the out-of-band buffers
+    """
     keys = [
         "Version",
         "ProgramStatus",
@@ -35,13 +82,166 @@ def save_session_state():
 
     buffer = generate_session_state_model(keys)
 
-    pickle.dump(buffer, bytestream, protocol=pickle.HIGHEST_PROTOCOL)
+    payload, buffers = _dump(buffer)
+    views = [pickle_buffer.raw() for pickle_buffer in buffers]
+
+    return payload, views
+
+
+def _write_session_state(
+    stream: BinaryIO, payload: bytes, views: List[memoryview]
+) -> None:
+    """
+    Writes a serialized session state (see _serialize_session_state) to a binary stream
+
+    Arguments
+    ---------
+        stream : BinaryIO
+            the binary stream opened for writing
+        payload : bytes
+            the pickle payload
+        views : List[memoryview]
+            the views of the out-of-band buffers
+    """
+    # Write the header, the size of the payload and of each buffer, then the payload and
+    # the buffers themselves
+    stream.write(OUT_OF_BAND_HEADER)
+    stream.write(struct.pack("<QQ", len(payload), len(views)))
+    stream.write(struct.pack(f"<{len(views)}Q", *[view.nbytes for view in views]))
+    stream.write(payload)
+    for view in views:
+        stream.write(view)
+
+
+def save_session_state():
+
+    bytestream = BytesIO()
+    _write_session_state(bytestream, *_serialize_session_state())
     bytestream.seek(0)
 
     return bytestream
 
 
 def load_session_state(file: BytesIO):
-    loaded_session_state: dict = pickle.load(file)
+
+    # Read the file in a writable buffer so that the arrays rebuilt from the out-of-band
+    # buffers can be modified without copying them
+    data = bytearray(file.read())
+
+    # Files saved by previous versions contain a plain pickle payload holding objects
+    # that lack the buffers introduced since then, so they are rejected, not loaded
+    if not data.startswith(OUT_OF_BAND_HEADER):
+        raise UnsupportedSessionFile
+
+    offset = len(OUT_OF_BAND_HEADER)
+    payload_size, n_buffers = struct.unpack_from("<QQ", data, offset)
+    offset += struct.calcsize("<QQ")
+    sizes = struct.unpack_from(f"<{n_buffers}Q", data, offset)
+    offset += struct.calcsize(f"<{n_buffers}Q")
+
+    view = memoryview(data)
+    payload = view[offset : offset + payload_size]
+    offset += payload_size
+
+    buffers = []
+    for size in sizes:
+        buffers.append(view[offset : offset + size])
+        offset += size
+
+    loaded_session_state: dict = pickle.loads(payload, buffers=buffers)
+
     for key, value in loaded_session_state.items():
         st.session_state[key] = value
+
+
+def get_checkpoint_path(key: str) -> str:
+    """
+    Returns the path of the checkpoint file associated to a given checkpoint key. The
+    filename is derived from a digest of the key so that the key cannot be recovered by
+    listing the folder.
+    """
+    digest = blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+    return f"./{CHECKPOINT_PREFIX}{digest}.exp"
+
+
+def remove_expired_checkpoints() -> None:
+    """
+    Removes the checkpoint files older than CHECKPOINT_MAX_AGE seconds
+    """
+    deadline = time.time() - CHECKPOINT_MAX_AGE
+    for path in glob.glob(f"./{CHECKPOINT_PREFIX}*.exp*"):
+        try:
+            if os.path.getmtime(path) < deadline:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_checkpoint(path: str, payload: bytes, views: List[memoryview]) -> None:
+    # The file is written under a temporary name and then renamed so that an interrupted
+    # write never leaves a corrupted checkpoint
+    with open(f"{path}.tmp", "wb") as file:
+        _write_session_state(file, payload, views)
+    os.replace(f"{path}.tmp", path)
+
+
+def save_checkpoint(key: str) -> Future:
+    """
+    Saves the session state (see save_session_state) to the checkpoint file of a given
+    checkpoint key. The session state is serialized on the calling thread, so that the
+    saved objects are not accessed while being modified, while the file is written by
+    the checkpoint worker thread.
+
+    Arguments
+    ---------
+        key : str
+            the secret key identifying the checkpoint of the session
+
+    Returns
+    -------
+        Future
+            the future of the write operation
+    """
+    return _CHECKPOINT_EXECUTOR.submit(
+        _write_checkpoint, get_checkpoint_path(key), *_serialize_session_state()
+    )
+
+
+def load_checkpoint(key: str) -> bool:
+    """
+    Loads in the session state the checkpoint file of a given checkpoint key, if
+    existing and not expired. Keys not generated by new_checkpoint_key are rejected.
+
+    Arguments
+    ---------
+        key : str
+            the secret key identifying the checkpoint of the session
+
+    Returns
+    -------
+        bool
+            True if the checkpoint has been loaded, False if no valid checkpoint exists
+    """
+    if re.fullmatch(CHECKPOINT_KEY_PATTERN, key) is None:
+        return False
+
+    remove_expired_checkpoints()
+
+    path = get_checkpoint_path(key)
+    if not os.path.isfile(path):
+        return False
+
+    with open(path, "rb") as file:
+        try:
+            load_session_state(file)
+        except UnsupportedSessionFile:
+            return False
+
+    return True
+
+
+def new_checkpoint_key() -> str:
+    """
+    Returns a new random secret key to be used to identify the checkpoint of a session
+    """
+    return secrets.token_urlsafe(32)
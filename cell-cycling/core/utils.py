@@ -1,4 +1,19 @@
+import glob, gzip, logging, pickle, re, time
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
+
+# Single worker thread used to write the session state dumps without blocking the script
+_DUMP_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session_dump")
+
+# Interval (in seconds) between the reruns of a page waiting for an experiment merge
+MERGE_POLL_INTERVAL = 0.2
+
+# Maximum number of dump files kept in the current folder
+MAX_DUMPS = 10
+
+# Pickled size above which the entries of the session state are omitted from the dumps
+MAX_DUMP_ITEM_BYTES = 64 * 1024**2
 
 def set_production_page_style():
 
@@ -16,9 +31,171 @@ def set_production_page_style():
 def force_update_once():
     if "forced update executed" not in st.session_state:
         st.session_state["forced update executed"] = False
-        st.experimental_rerun()
+        st.rerun()
     if not st.session_state["forced update executed"]:
         st.session_state["forced update executed"] = True
         return
     st.session_state["forced update executed"] = False
-    st.experimental_rerun()
\ No newline at end of file
+    st.rerun()
+
+
+def wait_for_experiment_merge(logger: logging.Logger) -> None:
+    """
+    Completes the experiment merge running in background, if any. The files are merged
+    by a worker thread into a copy of the experiment so that the object stored in the
+    program status is never accessed while being updated. While the merge is running
+    the page shows a spinner and is rerun every MERGE_POLL_INTERVAL seconds, once the
+    merge is done the original experiment is replaced with the merged copy both in the
+    program status and in the experiment containers. It must be called by every page
+    before accessing the experiments.
+
+    Arguments
+    ---------
+        logger : logging.Logger
+            the logger used to report the operation
+    """
+    if "merge_future" not in st.session_state:
+        return
+
+    experiment, skipped_files, future = st.session_state["merge_future"]
+    if not future.done():
+        message = f"Wait while the experiment '{experiment.name}' is updated"
+        with st.spinner(text=message):
+            time.sleep(MERGE_POLL_INTERVAL)
+        st.rerun()
+
+    del st.session_state["merge_future"]
+    merged = future.result()
+
+    merged._skipped_files += skipped_files
+
+    # Swap the merged copy in place of the original experiment (the experiment may have
+    # been removed in the meantime, e.g. by restoring a checkpoint)
+    try:
+        st.session_state["ProgramStatus"].replace_experiment(experiment, merged)
+    except ValueError:
+        logger.warning(f"Discarded the update of the removed experiment {merged.name}")
+        return
+
+    for container in st.session_state.get("ExperimentContainers", []):
+        container.replace_experiment(experiment, merged)
+
+    logger.info(f"UPDATED experiment {merged.name}")
+
+
+def _write_session_dump(file: BinaryIO, state: dict, logger: logging.Logger) -> None:
+    """
+    Pickles a snapshot of the session state to an already opened file, compressing it
+    with gzip, and closes it. Each entry is pickled separately as a (key, value) pair so
+    that only one value at a time is held in memory in serialized form and so that the
+    values that cannot be pickled, or whose pickle exceeds MAX_DUMP_ITEM_BYTES, are
+    replaced by a short description without losing the others (see load_session_dump).
+
+    Arguments
+    ---------
+        file : BinaryIO
+            the binary file opened for writing
+        state : dict
+            the snapshot of the session state
+        logger : logging.Logger
+            the logger used to report the outcome of the operation
+    """
+    try:
+        with file, gzip.GzipFile(fileobj=file, mode="wb", compresslevel=1) as stream:
+            for key, value in state.items():
+                try:
+                    entry = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+                except Exception:
+                    logger.warning(f"Cannot pickle the session state entry '{key}'")
+                    entry = pickle.dumps(
+                        (key, f"<unpicklable {type(value)}>"),
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+
+                # Omit the entries that are too large once pickled (e.g. the program
+                # status holding the dataframes of all the experiments)
+                if len(entry) > MAX_DUMP_ITEM_BYTES:
+                    logger.warning(f"Omitted the large session state entry '{key}'")
+                    entry = pickle.dumps(
+                        (key, f"<omitted {type(value)} pickled_bytes={len(entry)}>"),
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+                stream.write(entry)
+
+    except Exception:
+        logger.exception(f"Failed to dump the session state to '{file.name}'")
+    else:
+        logger.critical(f"Session state dumped to '{file.name}'")
+
+
+def load_session_dump(path: str) -> dict:
+    """
+    Loads a session state dump created by dump_session_state
+
+    Arguments
+    ---------
+        path : str
+            the path of the "GES_echem_gui_dump_<n>.pickle.gz" file
+
+    Returns
+    -------
+        dict
+            the dictionary containing the dumped session state entries
+    """
+    state = {}
+    with gzip.open(path, "rb") as stream:
+        unpickler = pickle.Unpickler(stream)
+        while True:
+            try:
+                key, value = unpickler.load()
+            except EOFError:
+                break
+            state[key] = value
+
+    return state
+
+
+def dump_session_state(logger: logging.Logger) -> None:
+    """
+    Dumps the content of the session state to the "GES_echem_gui_dump_<n>.pickle.gz"
+    file following the existing ones in the current folder. The file is reserved
+    immediately while the serialization of the session state is left to a background
+    thread so that the caller is not blocked. The session state is dumped at most once
+    per session and no new dump is created once MAX_DUMPS files are present.
+
+    Arguments
+    ---------
+        logger : logging.Logger
+            the logger used to report the operation
+    """
+    if st.session_state.get("__SESSION_DUMPED__", False):
+        logger.critical("Session state already dumped, skipping the dump")
+        return
+
+    # List the existing dumps with a single directory scan
+    existing = glob.glob("./GES_echem_gui_dump_*.pickle.gz")
+    if len(existing) >= MAX_DUMPS:
+        logger.critical(f"Maximum number of dumps ({MAX_DUMPS}) reached, skipping dump")
+        return
+
+    # Reserve the file following the one with the highest index (the index is moved
+    # forward if the file has been created in the meantime)
+    indices = [
+        int(match.group(1))
+        for match in (re.search(r"_(\d+)\.pickle\.gz$", path) for path in existing)
+        if match is not None
+    ]
+    dump_index = max(indices, default=-1) + 1
+    while True:
+        dump_file = f"./GES_echem_gui_dump_{dump_index}.pickle.gz"
+        try:
+            file = open(dump_file, "xb")
+        except FileExistsError:
+            dump_index += 1
+        else:
+            break
+
+    st.session_state["__SESSION_DUMPED__"] = True
+
+    logger.critical(f"Dumping the content of the session state to '{dump_file}'")
+    _DUMP_EXECUTOR.submit(_write_session_dump, file, dict(st.session_state), logger)
@@ -1,8 +1,10 @@
-import logging, traceback, os, sys, pickle
+import logging
 from io import BytesIO
 import streamlit as st
 
+from core.exceptions import UnsupportedSessionFile
 from core.session_state_manager import save_session_state, load_session_state
+from core.utils import dump_session_state, wait_for_experiment_merge
 
 
 # Fetch logger from the session state
@@ -24,6 +26,9 @@ logger.info("RUNNING export/import page rendering")
 
 try:
 
+    # Wait for the experiment merge started by the file manager (if any) to complete
+    wait_for_experiment_merge(logger)
+
     with st.sidebar:
         st.info(f'Session token: {st.session_state["Token"]}')
 
@@ -76,8 +81,16 @@ try:
         # If the button has been pressed and the file list is not empty load the files in the experiment
         if submitted and source:
             print_log_entry(source.name, save=False)
-            load_session_state(BytesIO(source.getvalue()))
-            st.experimental_rerun()
+            try:
+                load_session_state(BytesIO(source.getvalue()))
+            except UnsupportedSessionFile:
+                st.error(
+                    "ERROR: The file has been saved by a previous version of the"
+                    " program and cannot be loaded."
+                )
+                logger.error(f"ERROR: Unsupported session file '{source.name}'")
+            else:
+                st.rerun()
 
 except st.runtime.scriptrunner.script_runner.RerunException:
     logger.info("EXPERIMENTAL RERUN CALLED")
@@ -85,18 +98,9 @@ except st.runtime.scriptrunner.script_runner.RerunException:
 
 except:
     logger.exception(
-        f"Unexpected exception occurred during export/import page execution:\n\n {traceback.print_exception(*sys.exc_info())}"
+        "Unexpected exception occurred during export/import page execution"
     )
-    dump_index = 0
-    while True:
-        dump_file = f"./GES_echem_gui_dump_{dump_index}.pickle"
-        if os.path.isfile(dump_file):
-            dump_index += 1
-        else:
-            logger.critical(f"Dumping the content of the session state to '{dump_file}'")
-            with open(dump_file, "wb") as file:
-                pickle.dump(dict(st.session_state), file, protocol=pickle.HIGHEST_PROTOCOL)
-            break
+    dump_session_state(logger)
     raise
 
 else:
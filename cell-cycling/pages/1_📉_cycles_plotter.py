@@ -1,11 +1,14 @@
 from typing import Dict, List, Tuple, Union
-import math, logging, sys, os, traceback, pickle
+import math, logging
 import streamlit as st
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from functools import lru_cache
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 from core.gui_core import (
     ProgramStatus,
@@ -15,8 +18,14 @@ from core.gui_core import (
     ComparisonPlotSettings,
 )
 from core.experiment import Experiment
-from core.utils import set_production_page_style, force_update_once
-from core.colors import get_plotly_color, RGB_to_HEX
+from core.utils import (
+    set_production_page_style,
+    force_update_once,
+    dump_session_state,
+    wait_for_experiment_merge,
+)
+from core.colors import get_plotly_colors, get_HEX_shades
+from core.downsampling import lttb, m4_aggregate
 from echemsuite.cellcycling.cycles import HalfCycle
 
 
@@ -41,16 +50,132 @@ HALFCYCLE_SERIES = [
     "energy",
 ]
 
+# Position of each series in the HALFCYCLE_SERIES list and list of the series available
+# as y axis for each choice of the x axis
+HALFCYCLE_INDEX = {name: i for i, name in enumerate(HALFCYCLE_SERIES)}
+SUB_HALFCYCLE_SERIES = {
+    axis: [x for x in HALFCYCLE_SERIES if x != axis] for axis in HALFCYCLE_SERIES
+}
+
+# Number of samples above which a series is downsampled, number of samples kept by LTTB
+# and number of pixel columns used by the M4 aggregation of time series
+DOWNSAMPLING_THRESHOLD = 2000
+DOWNSAMPLING_POINTS = 1500
+DOWNSAMPLING_COLUMNS = 1200
+
+# Number of traces of the comparison plot above which the WebGL renderer is used
+WEBGL_TRACES_THRESHOLD = 20
+
+# Data type of the arrays sent to plotly, single precision halves the size of the figure
+# without any visible difference in the plot
+PLOT_DTYPE = np.float32
+
+
+def _as_series_array(series, factor: Union[None, float] = None) -> np.ndarray:
+    """
+    Converts a pandas series in a float64 numpy array eventually multiplied by a scaling
+    factor. The conversion does not copy the data when the series already holds float64
+    values and the scaling, if any, allocates a single output array.
+
+    Arguments
+    ---------
+        series : pd.Series
+            the series to be converted
+        factor : Union[None, float]
+            if not None the factor by which the series must be multiplied
+
+    Returns
+    -------
+        np.ndarray
+            the float64 array containing the (eventually scaled) data of the series
+    """
+    array = np.asarray(series.to_numpy(copy=False), dtype=np.float64)
+    return array if factor is None else np.multiply(array, factor)
+
+
+# Table associating to each entry of HALFCYCLE_SERIES the name of the halfcycle attribute
+# holding the data, the quantity ("volume", "area" or None) by which the series can be
+# normalized, the multiplier applied upon normalization and the labels of the plain and
+# normalized series
+_SERIES_DEFINITIONS = {
+    "time": ("time", None, None, "Time (s)", None),
+    "voltage": ("voltage", None, None, "Voltage (V)", None),
+    "current": (
+        "current",
+        "area",
+        1.0,
+        "Current (A)",
+        "Current density (A/cm<sup>2</sup>)",
+    ),
+    "charge": ("Q", "volume", 1e-3, "Capacity (mAh)", "Volumetric capacity (Ah/L)"),
+    "power": (
+        "power",
+        "area",
+        1000.0,
+        "Power (W)",
+        "Power density (mW/cm<sup>2</sup>)",
+    ),
+    "energy": ("energy", "volume", 1e-3, "Energy (mWh)", "Energy density (Wh/L)"),
+}
+
+
+def _get_normalization(
+    title: str, volume: Union[None, float], area: Union[None, float]
+) -> Union[None, float]:
+    """
+    Returns the value of the quantity by which a given series must be normalized (None if
+    no normalization is required).
+    """
+    if title not in _SERIES_DEFINITIONS:
+        raise ValueError
+
+    normalization = _SERIES_DEFINITIONS[title][1]
+    if normalization == "volume":
+        return volume
+    elif normalization == "area":
+        return area
+    return None
+
+
+def get_series_label(
+    title: str,
+    volume: Union[None, float] = None,
+    area: Union[None, float] = None,
+) -> str:
+    """
+    Given the title of the data series returns the label to be used for the corresponding
+    plot axis.
+
+    Arguments
+    ---------
+        title : str
+            the title of the series. Note that the title must match one of the entries of
+            the HALFCYCLE_SERIES list variable.
+        volume: Union[None, float]
+            if not None will trigger the normalization of charge and energy per unit volume
+        area: Union[None, float]
+            if not None will trigger the normalization of current and power per unit area
+
+    Returns
+    -------
+        str
+            the label of the series
+    """
+    normalization = _get_normalization(title, volume, area)
+    _, _, _, label, normalized_label = _SERIES_DEFINITIONS[title]
+
+    return label if normalization is None else normalized_label
+
 
 def get_halfcycle_series(
     halfcycle: HalfCycle,
     title: str,
     volume: Union[None, float] = None,
     area: Union[None, float] = None,
-) -> Tuple[str, pd.Series]:
+) -> np.ndarray:
     """
-    Given the halfcycle of interest and the title of the data series, retuns the pandas
-    Serier containing the data to plot
+    Given the halfcycle of interest and the title of the data series, retuns the numpy
+    array containing the data to plot
 
     Arguments
     ---------
@@ -60,46 +185,534 @@ def get_halfcycle_series(
             the title of the series to be taken from the halfcycle. Note that the title
             must match one of the entries of the HALFCYCLE_SERIES list variable.
         volume: Union[None, float]
-            if not None will trigger the normalization of current, charge and energy per unit area
+            if not None will trigger the normalization of charge and energy per unit volume
         area: Union[None, float]
-            if not None will trigger the normalization of current, charge and energy per unit area
+            if not None will trigger the normalization of current and power per unit area
+
+    Returns
+    -------
+        np.ndarray
+            the float64 array containing the (eventually normalized) data series, the
+            corresponding label can be obtained from the get_series_label function
     """
-    if title == "time":
-        return "Time (s)", halfcycle.time
+    normalization = _get_normalization(title, volume, area)
+    attribute, _, multiplier, _, _ = _SERIES_DEFINITIONS[title]
 
-    elif title == "voltage":
-        return "Voltage (V)", halfcycle.voltage
+    return _as_series_array(
+        getattr(halfcycle, attribute),
+        None if normalization is None else multiplier / normalization,
+    )
 
-    elif title == "current":
-        current = halfcycle.current
-        if area is None:
-            return "Current (A)", current
-        else:
-            return "Current density (A/cm<sup>2</sup>)", current / area
 
-    elif title == "charge":
-        charge = halfcycle.Q
-        if volume is None:
-            return "Capacity (mAh)", charge
-        else:
-            return "Volumetric capacity (Ah/L)", charge / (1000 * volume)
+@st.cache_data(max_entries=4096, show_spinner=False)
+def get_cached_halfcycle_series(
+    _halfcycle: HalfCycle,
+    revision: str,
+    cycle_id: int,
+    halfcycle_type: str,
+    title: str,
+    volume: Union[None, float] = None,
+    area: Union[None, float] = None,
+) -> np.ndarray:
+    """
+    Cached version of the get_halfcycle_series function. The halfcycle object is not hashed
+    by streamlit and the cache entry is identified by the experiment revision, the cycle
+    number and the type of halfcycle so that the series are recomputed only when the cycles
+    of the experiment are rebuilt.
 
-    elif title == "power":
-        power = halfcycle.power
-        if area is None:
-            return "Power (W)", power
-        else:
-            return "Power density (mW/cm<sup>2</sup>)", 1000 * power / area
+    Arguments
+    ---------
+        _halfcycle : HalfCycle
+            the halfcycle from which the data must be taken
+        revision : str
+            the revision key of the experiment to which the halfcycle belongs
+        cycle_id : int
+            the number of the cycle to which the halfcycle belongs
+        halfcycle_type : str
+            the type of halfcycle ("charge" or "discharge")
+        title : str
+            the title of the series to be taken from the halfcycle (see get_halfcycle_series)
+        volume: Union[None, float]
+            if not None will trigger the normalization of charge and energy per unit volume
+        area: Union[None, float]
+            if not None will trigger the normalization of current and power per unit area
+    """
+    return get_halfcycle_series(_halfcycle, title, volume, area)
 
-    elif title == "energy":
-        energy = halfcycle.energy
-        if volume is None:
-            return "Energy (mWh)", energy
-        else:
-            return "Energy density (Wh/L)", energy / (1000 * volume)
 
+def downsample_series(
+    x_axis: str, x_series: np.ndarray, y_series: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces the number of points of a series to be plotted. Series plotted as a function of
+    time (always increasing) are reduced using the M4 aggregation while all the others are
+    reduced using the LTTB algorithm.
+
+    Arguments
+    ---------
+        x_axis : str
+            the title of the series used as x axis (see HALFCYCLE_SERIES)
+        x_series : np.ndarray
+            the x values of the series
+        y_series : np.ndarray
+            the y values of the series
+
+    Returns
+    -------
+        Tuple[np.ndarray, np.ndarray]
+            the x and y values of the downsampled series
+    """
+    if x_axis == "time":
+        return m4_aggregate(x_series, y_series, DOWNSAMPLING_COLUMNS)
     else:
-        raise ValueError
+        return lttb(x_series, y_series, DOWNSAMPLING_POINTS)
+
+
+def merge_segments(
+    x_segments: List[np.ndarray], y_segments: List[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merges a list of line segments in a single series in which consecutive segments are
+    separated by a NaN value so that they can be plotted as a single trace without being
+    connected to each other. The merged series is converted to PLOT_DTYPE.
+
+    Arguments
+    ---------
+        x_segments : List[np.ndarray]
+            the x values of each segment
+        y_segments : List[np.ndarray]
+            the y values of each segment
+
+    Returns
+    -------
+        Tuple[np.ndarray, np.ndarray]
+            the x and y values of the merged series
+    """
+    separator = np.array([np.nan])
+
+    x_parts, y_parts = [x_segments[0]], [y_segments[0]]
+    for x, y in zip(x_segments[1:], y_segments[1:]):
+        x_parts.extend((separator, x))
+        y_parts.extend((separator, y))
+
+    return (
+        np.concatenate(x_parts, dtype=PLOT_DTYPE),
+        np.concatenate(y_parts, dtype=PLOT_DTYPE),
+    )
+
+
+def build_experiment_traces(
+    experiment: Experiment,
+    experiment_signature: tuple,
+    settings_signature: tuple,
+) -> Tuple[List[dict], str, str]:
+    """
+    Builds the traces of the stacked plot associated to a single experiment. The traces
+    are returned as plain dictionaries to be validated only once when the figure is built.
+
+    Arguments
+    ---------
+        experiment : Experiment
+            the experiment object from which the cycles must be taken
+        experiment_signature : tuple
+            the entry of the selection signature associated to the experiment (see
+            build_stacked_figure)
+        settings_signature : tuple
+            the settings signature of the stacked plot (see build_stacked_figure)
+
+    Returns
+    -------
+        Tuple[List[dict], str, str]
+            the list of traces and the labels of the x and y axis (None if no trace has
+            been built)
+    """
+    name, revision, _, volume, area, cycle_view = experiment_signature
+    x_axis, y_axis, _, show_charge, show_discharge, downsample, reverse = (
+        settings_signature
+    )
+
+    logger.debug(f"-> Plotting data for experiment {name}")
+
+    traces = []
+
+    # Get the user selected cycles and plot only the corresponden lines
+    num_traces = len(cycle_view)
+    logger.debug(f"-> Number of traces: {num_traces}")
+
+    # Get the shades associated to each trace of the experiment
+    shades = get_HEX_shades(experiment.color.get_RGB(), num_traces, reverse)
+
+    # The charge and discharge traces of each cycle share the same legend group (and the
+    # same legend entry) so that they can be hidden or shown together
+    for shade, (cycle_id, series_name) in zip(shades, cycle_view):
+
+        # extract the cycle given the id selected
+        cycle = experiment.get_cycle(cycle_id)
+
+        # Print the charge halfcycle
+        if cycle.charge is not None and show_charge is True:
+
+            x_series = get_cached_halfcycle_series(
+                cycle.charge, revision, cycle_id, "charge", x_axis, volume, area
+            )
+            y_series = get_cached_halfcycle_series(
+                cycle.charge, revision, cycle_id, "charge", y_axis, volume, area
+            )
+
+            # Reduce the number of samples sent to the browser
+            if downsample and len(x_series) > DOWNSAMPLING_THRESHOLD:
+                x_series, y_series = downsample_series(x_axis, x_series, y_series)
+            x_series, y_series = x_series.astype(PLOT_DTYPE), y_series.astype(PLOT_DTYPE)
+
+            traces.append(
+                {
+                    "type": "scattergl",
+                    "x": x_series,
+                    "y": y_series,
+                    "line": {"color": shade},
+                    "name": series_name,
+                    "legendgroup": f"{name}_{cycle_id}",
+                    "mode": "lines",
+                }
+            )
+
+        # Print the discharge halfcycle
+        if cycle.discharge is not None and show_discharge is True:
+
+            x_series = get_cached_halfcycle_series(
+                cycle.discharge, revision, cycle_id, "discharge", x_axis, volume, area
+            )
+            y_series = get_cached_halfcycle_series(
+                cycle.discharge, revision, cycle_id, "discharge", y_axis, volume, area
+            )
+
+            # Reduce the number of samples sent to the browser
+            if downsample and len(x_series) > DOWNSAMPLING_THRESHOLD:
+                x_series, y_series = downsample_series(x_axis, x_series, y_series)
+            x_series, y_series = x_series.astype(PLOT_DTYPE), y_series.astype(PLOT_DTYPE)
+
+            traces.append(
+                {
+                    "type": "scattergl",
+                    "x": x_series,
+                    "y": y_series,
+                    "line": {"color": shade},
+                    "name": series_name,
+                    "legendgroup": f"{name}_{cycle_id}",
+                    "showlegend": False if cycle.charge else True,
+                    "mode": "lines",
+                }
+            )
+
+    # Compute the axis labels only if at least a trace has been built
+    if traces == []:
+        return traces, None, None
+
+    x_label = get_series_label(x_axis, volume, area)
+    y_label = get_series_label(y_axis, volume, area)
+
+    return traces, x_label, y_label
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_stacked_figure(
+    selection_signature: tuple,
+    settings_signature: tuple,
+    _experiments: Dict[str, Experiment],
+) -> Tuple[go.Figure, str, str]:
+    """
+    Builds the stacked plot figure with all its traces. The function is cached by streamlit
+    based on the selection and settings signatures so that reruns triggered by aspect-only
+    options (fonts, height, ranges) reuse the already built figure. The traces of the
+    different experiments are built concurrently by a pool of threads.
+
+    Arguments
+    ---------
+        selection_signature : tuple
+            tuple containing, for each experiment in the view, the name, the revision key, the
+            base color, the volume and area used for scaling (None if no scaling is required)
+            and the tuple of (cycle number, label) pairs to be plotted
+        settings_signature : tuple
+            tuple containing the x and y axis series, the shared x-axis mode, the show charge,
+            show discharge, downsample and reversed colorscale flags
+        _experiments : Dict[str, Experiment]
+            dictionary mapping the experiment names to the experiment objects (not hashed)
+
+    Returns
+    -------
+        Tuple[go.Figure, str, str]
+            the figure and the labels of the x and y axis (None if no trace has been added)
+    """
+    shared_x = settings_signature[2]
+
+    # Create the layout of a figure with a number of subplots equal to the numebr of
+    # selected experiments
+    layout = make_subplots(
+        cols=1,
+        rows=len(selection_signature),
+        shared_xaxes=shared_x,
+        vertical_spacing=0 if shared_x else None,
+    ).layout
+
+    # Build the traces of each experiment in a separate thread. The script run context is
+    # attached to the worker threads so that they can access the streamlit cache
+    with ThreadPoolExecutor(
+        max_workers=min(8, len(selection_signature)),
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    ) as executor:
+        results = list(
+            executor.map(
+                lambda entry: build_experiment_traces(
+                    _experiments[entry[0]], entry, settings_signature
+                ),
+                selection_signature,
+            )
+        )
+
+    x_label, y_label = None, None
+
+    # Collect the traces assigning to each of them the axis of its subplot
+    traces = []
+    for index, (experiment_traces, experiment_x_label, experiment_y_label) in enumerate(
+        results
+    ):
+        suffix = "" if index == 0 else str(index + 1)
+        for trace in experiment_traces:
+            trace["xaxis"], trace["yaxis"] = f"x{suffix}", f"y{suffix}"
+        traces.extend(experiment_traces)
+
+        if experiment_x_label and experiment_y_label:
+            x_label, y_label = experiment_x_label, experiment_y_label
+
+    # Create the figure with all the traces, and the subplots layout, with a single call
+    fig = go.Figure(data=traces, layout=layout, _validate=False)
+
+    return fig, x_label, y_label
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_comparison_figure(
+    series_signature: tuple,
+    settings_signature: tuple,
+    _experiments: Dict[str, Experiment],
+) -> Tuple[go.Figure, str, str]:
+    """
+    Builds the comparison plot figure with all its traces. The charge and discharge
+    halfcycles of the series sharing the same label and color are merged in a single trace.
+    The function is cached by streamlit based on the series and settings signatures so
+    that reruns triggered by aspect-only options (fonts, height) reuse the already built
+    figure.
+
+    Arguments
+    ---------
+        series_signature : tuple
+            tuple containing, for each series, the label, the experiment name, the revision
+            key of the experiment, the cycle number, the HEX color and the volume and area
+            used for scaling (None if no scaling is required)
+        settings_signature : tuple
+            tuple containing the x and y axis series
+        _experiments : Dict[str, Experiment]
+            dictionary mapping the experiment names to the experiment objects (not hashed)
+
+    Returns
+    -------
+        Tuple[go.Figure, str, str]
+            the figure and the labels of the x and y axis (None if no trace has been added)
+    """
+    x_axis, y_axis = settings_signature
+
+    # For each series collect the charge and discharge segments to be plotted grouping
+    # them according to their label and color
+    segments: Dict[Tuple[str, str], Tuple[str, list, list]] = {}
+    for label, name, revision, cycle_id, color, volume, area in series_signature:
+
+        logger.debug(f"-> Plotting data for series {label}")
+
+        cycle = _experiments[name].get_cycle(cycle_id)
+
+        _, x_segments, y_segments = segments.setdefault((label, color), (name, [], []))
+
+        # Collect the charge and discharge halfcycles
+        for halfcycle_type, halfcycle in (
+            ("charge", cycle.charge),
+            ("discharge", cycle.discharge),
+        ):
+
+            if halfcycle is None:
+                continue
+
+            x_segments.append(
+                get_cached_halfcycle_series(
+                    halfcycle, revision, cycle_id, halfcycle_type, x_axis, volume, area
+                )
+            )
+            y_segments.append(
+                get_cached_halfcycle_series(
+                    halfcycle, revision, cycle_id, halfcycle_type, y_axis, volume, area
+                )
+            )
+
+    # Render the traces as SVG lines (sharper and exported as vector graphics) unless their
+    # number is large enough to require WebGL rendering
+    trace_type = "scattergl" if len(segments) > WEBGL_TRACES_THRESHOLD else "scatter"
+
+    # Build a single trace for each group of segments. The traces are collected as plain
+    # dictionaries and validated only once when the figure is created. The legend entries
+    # are grouped, under a common title, according to the experiment
+    traces = []
+    for (label, color), (name, x_segments, y_segments) in segments.items():
+
+        if x_segments == []:
+            continue
+
+        x_series, y_series = merge_segments(x_segments, y_segments)
+
+        traces.append(
+            {
+                "type": trace_type,
+                "x": x_series,
+                "y": y_series,
+                "line": {"color": color},
+                "name": label,
+                "legendgroup": name,
+                "legendgrouptitle": {"text": name},
+                "mode": "lines",
+            }
+        )
+
+    # Create a figure with a single plot containing all the traces
+    fig = go.Figure(data=traces, _validate=False)
+
+    # Compute the axis labels, once, only if at least a trace has been built (the scaling
+    # is applied to all the series or none of them so the first one is representative)
+    if traces == []:
+        return fig, None, None
+
+    _, _, _, _, _, volume, area = series_signature[0]
+    x_label = get_series_label(x_axis, volume, area)
+    y_label = get_series_label(y_axis, volume, area)
+
+    return fig, x_label, y_label
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_full_layout(
+    fingerprint: int,
+    x_range: Tuple[float, float],
+    y_range: Tuple[float, float],
+    _fig: go.Figure,
+) -> go.Layout:
+    """
+    Returns the layout of the figure with all the attributes computed by plotly (e.g. the
+    automatic axis ranges). The computation requires a round-trip to the plotly javascript
+    engine and its result is cached on the figure fingerprint and on the axis ranges
+    currently set by the user. To reduce the amount of data sent to the engine, each trace
+    is replaced by the two corners of its bounding box, which lead to the same automatic
+    ranges of the full trace.
+
+    Arguments
+    ---------
+        fingerprint : int
+            hash of the selection and settings signatures used to build the figure
+        x_range : Tuple[float, float]
+            the x-axis range applied to the figure (None if automatic)
+        y_range : Tuple[float, float]
+            the y-axis range applied to the figure (None if automatic)
+        _fig : go.Figure
+            the figure of which the full layout must be computed (not hashed)
+    """
+    stub = go.Figure(layout=_fig.layout)
+
+    # Replace each trace with the corners of its bounding box in the same subplot
+    corners = []
+    for trace in _fig.data:
+        x, y = np.asarray(trace.x, dtype=float), np.asarray(trace.y, dtype=float)
+        if x.size == 0 or np.isnan(x).all() or np.isnan(y).all():
+            continue
+        corners.append(
+            type(trace)(
+                x=[np.nanmin(x), np.nanmax(x)],
+                y=[np.nanmin(y), np.nanmax(y)],
+                mode=trace.mode,
+                xaxis=trace.xaxis,
+                yaxis=trace.yaxis,
+            )
+        )
+    stub.add_traces(corners)
+
+    return stub.full_figure_for_development(warn=False).layout
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def render_figure_image(fig_json: str, fmt: str, width: int, height: int) -> bytes:
+    """
+    Renders a figure to a static image. The function is cached on the JSON representation
+    of the figure so that the image is not rendered again, by Kaleido, on reruns that do
+    not change the figure.
+
+    Arguments
+    ---------
+        fig_json : str
+            the JSON representation of the figure
+        fmt : str
+            the format of the image (e.g. "png", "svg", "pdf")
+        width : int
+            the width of the image in pixels
+        height : int
+            the height of the image in pixels
+
+    Returns
+    -------
+        bytes
+            the content of the image file
+    """
+    return pio.from_json(fig_json).to_image(format=fmt, width=width, height=height)
+
+
+@lru_cache(maxsize=32)
+def get_axis_labels(axis: str, n: int) -> Tuple[str]:
+    """
+    Returns the names of the layout entries associated to a given axis in a figure with n
+    stacked subplots (e.g. "xaxis", "xaxis2", ..., "xaxisn").
+
+    Arguments
+    ---------
+        axis : str
+            the axis of interest ("x" or "y")
+        n : int
+            the number of subplots in the figure
+    """
+    return (f"{axis}axis",) + tuple(f"{axis}axis{i+1}" for i in range(1, n))
+
+
+def get_axis_bounds(layout: go.Layout, axis: str, n: int) -> Tuple[float, float]:
+    """
+    Returns the smallest interval containing the ranges of a given axis in all the subplots
+    of the stacked plot.
+
+    Arguments
+    ---------
+        layout : go.Layout
+            the full layout of the figure (see get_full_layout)
+        axis : str
+            the axis of interest ("x" or "y")
+        n : int
+            the number of subplots in the figure
+
+    Returns
+    -------
+        Tuple[float, float]
+            the minimum and maximum value of the axis
+    """
+    lower, upper = math.inf, -math.inf
+    for label in get_axis_labels(axis, n):
+        low, high = layout[label].range
+        if low < lower:
+            lower = low
+        if high > upper:
+            upper = high
+    return float(lower), float(upper)
 
 
 # Create an instance of the ExperimentSelector class to be used to define the data to plot
@@ -112,6 +725,50 @@ if "Page2_CyclePlotSelection" not in st.session_state:
     st.session_state["Page2_comparison_settings"] = ComparisonPlotSettings()
 
 
+def update_stacked_settings(**changes) -> StackedPlotSettings:
+    """
+    Replaces the stacked plot settings stored in the session state with a copy in which the
+    given fields are changed
+
+    Arguments
+    ---------
+        **changes
+            the new values of the fields to be changed
+
+    Returns
+    -------
+        StackedPlotSettings
+            the updated settings object
+    """
+    settings: StackedPlotSettings = st.session_state["Page2_stacked_settings"]
+    if any(getattr(settings, key) != value for key, value in changes.items()):
+        settings = replace(settings, **changes)
+        st.session_state["Page2_stacked_settings"] = settings
+    return settings
+
+
+def update_comparison_settings(**changes) -> ComparisonPlotSettings:
+    """
+    Replaces the comparison plot settings stored in the session state with a copy in which
+    the given fields are changed
+
+    Arguments
+    ---------
+        **changes
+            the new values of the fields to be changed
+
+    Returns
+    -------
+        ComparisonPlotSettings
+            the updated settings object
+    """
+    settings: ComparisonPlotSettings = st.session_state["Page2_comparison_settings"]
+    if any(getattr(settings, key) != value for key, value in changes.items()):
+        settings = replace(settings, **changes)
+        st.session_state["Page2_comparison_settings"] = settings
+    return settings
+
+
 def clean_manual_selection_buffer():
     st.session_state["Page2_ManualSelectorBuffer"] = []
 
@@ -127,12 +784,7 @@ def remove_experiment_from_series_buffer(name: str) -> None:
         the name of the experiment to remove
     """
     selected_series: List[SingleCycleSeries] = st.session_state["Page2_ComparisonPlot"]
-    buffer = deepcopy(selected_series)
-    selected_series.clear()
-
-    for series in buffer:
-        if series.experiment_name != name:
-            selected_series.append(series)
+    selected_series[:] = [obj for obj in selected_series if obj.experiment_name != name]
 
 
 # Fetch a fresh instance of the Progam Status and Experiment Selection variables from the session state
@@ -142,10 +794,609 @@ selected_series: List[SingleCycleSeries] = st.session_state["Page2_ComparisonPlo
 stacked_settings: StackedPlotSettings = st.session_state["Page2_stacked_settings"]
 comparison_settings: ComparisonPlotSettings = st.session_state["Page2_comparison_settings"]
 
+def set_stacked_autorange(axis: str) -> None:
+    """
+    Callback applying to the stacked plot settings the autorange option selected by the
+    user for a given axis. The range of the axis is reset so that it can be computed again.
+
+    Arguments
+    ---------
+        axis : str
+            the axis of interest ("x" or "y")
+    """
+    autorange = st.session_state[f"Page2_{axis}_autorange"]
+    update_stacked_settings(**{f"{axis}_autorange": autorange, f"{axis}_range": None})
+    logger.info(f"{axis.upper()} Autorange: {autorange}")
+
+
+def set_stacked_range(axis: str) -> None:
+    """
+    Callback applying to the stacked plot settings the range selected by the user for a
+    given axis.
+
+    Arguments
+    ---------
+        axis : str
+            the axis of interest ("x" or "y")
+    """
+    limits = (
+        float(st.session_state[f"Page2_{axis}_min"]),
+        float(st.session_state[f"Page2_{axis}_max"]),
+    )
+    update_stacked_settings(**{f"{axis}_range": limits})
+    logger.info(f"SET {axis} range: {limits}")
+
+
+@st.fragment
+def render_stacked_plot() -> None:
+    """
+    Renders the stacked plot and its options panel. The function is a streamlit fragment so
+    that the interaction with the plot options reruns only the stacked plot section of the
+    page.
+    """
+    # Fetch the current stacked plot settings from the session state
+    stacked_settings: StackedPlotSettings = st.session_state["Page2_stacked_settings"]
+
+    logger.info("Entering plot section")
+
+    # Get the mapping between experiment names and experiment objects
+    exp_by_name: Dict[str, Experiment] = status.get_experiment_map()
+
+    col1, col2 = st.columns([4, 1])
+
+    # Visualize some plot options in a small coulomn on the right
+    with col2:
+
+        logger.info("Entering plot option section")
+
+        st.markdown("#### Plot options")
+
+        with st.expander("Axis options:"):
+            st.markdown("###### Axis")
+            stacked_settings = update_stacked_settings(
+                x_axis=st.selectbox(
+                    "Select the series x axis",
+                    HALFCYCLE_SERIES,
+                    index=(
+                        HALFCYCLE_INDEX[stacked_settings.x_axis]
+                        if stacked_settings.x_axis
+                        else 0
+                    ),
+                )
+            )
+            logger.debug(f"-> X axis: {stacked_settings.x_axis}")
+
+            sub_HALFCYCLE_SERIES = SUB_HALFCYCLE_SERIES[stacked_settings.x_axis]
+            stacked_settings = update_stacked_settings(
+                y_axis=st.selectbox(
+                    "Select the series y axis",
+                    sub_HALFCYCLE_SERIES,
+                    index=(
+                        sub_HALFCYCLE_SERIES.index(stacked_settings.y_axis)
+                        if stacked_settings.y_axis
+                        and stacked_settings.y_axis in sub_HALFCYCLE_SERIES
+                        else 0
+                    ),
+                )
+            )
+            logger.debug(f"-> Y axis: {stacked_settings.y_axis}")
+
+            stacked_settings = update_stacked_settings(
+                shared_x=st.checkbox(
+                    "Use shared x-axis",
+                    value=(
+                        stacked_settings.shared_x
+                        if stacked_settings.shared_x
+                        and len(selected_experiments) == 1
+                        else False
+                    ),
+                    disabled=(
+                        True if len(selected_experiments) == 1 else False
+                    ),
+                )
+            )
+            logger.debug(f"-> Shared X mode: {stacked_settings.shared_x}")
+
+            volume_is_available = all(
+                exp_by_name[name].volume is not None
+                for name in selected_experiments.view
+            )
+
+            stacked_settings = update_stacked_settings(
+                scale_by_volume=st.checkbox(
+                    "Scale values by volume",
+                    value=(
+                        stacked_settings.scale_by_volume
+                        if volume_is_available
+                        else False
+                    ),
+                    disabled=not volume_is_available,
+                )
+            )
+            logger.debug(
+                f"-> Scale by volume: {stacked_settings.scale_by_volume}"
+            )
+
+            area_is_available = all(
+                exp_by_name[name].area is not None
+                for name in selected_experiments.view
+            )
+
+            stacked_settings = update_stacked_settings(
+                scale_by_area=st.checkbox(
+                    "Scale values by area",
+                    value=(
+                        stacked_settings.scale_by_area
+                        if area_is_available
+                        else False
+                    ),
+                    disabled=not area_is_available,
+                )
+            )
+            logger.debug(f"-> Scale by area: {stacked_settings.scale_by_area}")
+
+        with st.expander("Series options:"):
+            st.markdown("###### Series")
+            stacked_settings = update_stacked_settings(
+                show_charge=st.checkbox(
+                    "Show charge", value=stacked_settings.show_charge
+                )
+            )
+            logger.debug(f"-> Show charge: {stacked_settings.show_charge}")
+
+            stacked_settings = update_stacked_settings(
+                show_discharge=st.checkbox(
+                    "Show discharge", value=stacked_settings.show_discharge
+                )
+            )
+            logger.debug(
+                f"-> Show discharge: {stacked_settings.show_discharge}"
+            )
+
+            stacked_settings = update_stacked_settings(
+                downsample=st.checkbox(
+                    "Downsample long series",
+                    value=stacked_settings.downsample,
+                    help="""Reduce the number of points of each series to speed up the
+                rendering of the plot while preserving its visual shape""",
+                )
+            )
+            logger.debug(f"-> Downsample: {stacked_settings.downsample}")
+
+        with st.expander("Aspect options:"):
+            st.markdown("###### Aspect")
+
+            stacked_settings = update_stacked_settings(
+                reverse=st.checkbox(
+                    "Reversed colorscale",
+                    value=stacked_settings.reverse,
+                    key="stacked_reverse",
+                )
+            )
+            logger.debug(f"-> Reversed colorscale: {stacked_settings.reverse}")
+
+            stacked_settings = update_stacked_settings(
+                font_size=int(
+                    st.number_input(
+                        "Label/tick font size",
+                        min_value=4,
+                        value=stacked_settings.font_size,
+                    )
+                )
+            )
+            logger.debug(
+                f"-> Label/tick font size: {stacked_settings.font_size}"
+            )
+
+            stacked_settings = update_stacked_settings(
+                axis_font_size=int(
+                    st.number_input(
+                        "Axis title font size",
+                        min_value=4,
+                        value=stacked_settings.axis_font_size,
+                    )
+                )
+            )
+            logger.debug(
+                f"-> Axis font size: {stacked_settings.axis_font_size}"
+            )
+
+            stacked_settings = update_stacked_settings(
+                plot_height=int(
+                    st.number_input(
+                        "Subplot height",
+                        min_value=10,
+                        value=stacked_settings.plot_height,
+                        step=10,
+                    )
+                )
+            )
+            logger.debug(f"-> Plot height: {stacked_settings.plot_height}")
+
+    with col1:
+
+        logger.info("Entering plot rendering section")
+
+        # Define the signature of the selected data and of the settings affecting
+        # the traces so that the figure is rebuilt only when one of them changes
+        selection_signature = tuple(
+            (
+                name,
+                exp_by_name[name].revision,
+                exp_by_name[name].color.get_RGB(),
+                exp_by_name[name].volume
+                if stacked_settings.scale_by_volume
+                else None,
+                exp_by_name[name].area if stacked_settings.scale_by_area else None,
+                tuple(
+                    (obj.number, obj.label)
+                    for obj in selected_experiments.view[name]
+                ),
+            )
+            for name in selected_experiments.names
+        )
+        settings_signature = (
+            stacked_settings.x_axis,
+            stacked_settings.y_axis,
+            stacked_settings.shared_x,
+            stacked_settings.show_charge,
+            stacked_settings.show_discharge,
+            stacked_settings.downsample,
+            stacked_settings.reverse,
+        )
+
+        # If nothing changed since the last render reuse the base figure stored in the
+        # session state, else build (or fetch from cache) a new one. The base figure is
+        # never modified: the layout options of the current run are applied to a copy
+        fingerprint = hash((selection_signature, settings_signature))
+        if st.session_state.get("Page2_last_fp") == fingerprint:
+            base_fig = st.session_state["Page2_last_fig"]
+            x_label, y_label = st.session_state["Page2_last_labels"]
+            logger.debug("-> Reusing the last stacked figure")
+        else:
+            base_fig, x_label, y_label = build_stacked_figure(
+                selection_signature, settings_signature, exp_by_name
+            )
+            st.session_state["Page2_last_fp"] = fingerprint
+            st.session_state["Page2_last_fig"] = base_fig
+            st.session_state["Page2_last_labels"] = (x_label, y_label)
+
+        fig = go.Figure(base_fig, _validate=False)
+
+        if x_label and y_label:
+
+            # Define the settings shared by the x and y axis
+            axis_settings = {
+                "showline": True,
+                "linecolor": "black",
+                "gridwidth": 1,
+                "gridcolor": "#DDDDDD",
+                "title_font": {"size": stacked_settings.axis_font_size},
+            }
+
+            # Update the settings of the x-axis
+            fig.update_xaxes(
+                title_text=x_label,
+                range=stacked_settings.x_range,
+                dtick=stacked_settings.x_dtick,
+                **axis_settings,
+            )
+
+            # If the x-axis is shared keep the title only on the bottom subplot
+            if stacked_settings.shared_x:
+                axis_labels = get_axis_labels("x", len(selected_experiments))
+                fig.update_layout({label: {"title_text": ""} for label in axis_labels[:-1]})
+
+            # Update the settings of the y-axis
+            fig.update_yaxes(
+                title_text=y_label,
+                range=stacked_settings.y_range,
+                dtick=stacked_settings.y_dtick,
+                **axis_settings,
+            )
+
+            # Update the settings of plot layout
+            fig.update_layout(
+                plot_bgcolor="#FFFFFF",
+                height=stacked_settings.plot_height
+                * len(selected_experiments.names),
+                width=None,
+                font=dict(size=stacked_settings.font_size),
+            )
+
+            st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    with col2:
+
+        logger.info("Re-Entering plot option section to render export section")
+
+        # If neither charge nor discharge are shown skip the range and export options, both
+        # requiring plotly to render the figure
+        if not stacked_settings.show_charge and not stacked_settings.show_discharge:
+            st.info("Enable charge or discharge traces to set the ranges and export the plot")
+            return
+
+        # Layout of the figure with all the values computed by plotly, evaluated
+        # only once and only if one of the automatic ranges is needed
+        full_layout = None
+
+        # Define a expander to hold the options relative to the plot range and ticks
+        with st.expander("Range/ticks options"):
+            st.markdown("###### Range options")
+
+            # Show a checkbox to enable/disable automatic axis range
+            st.markdown("X-axis range")
+            st.session_state["Page2_x_autorange"] = stacked_settings.x_autorange
+            st.checkbox(
+                "Use automatic range for X",
+                key="Page2_x_autorange",
+                on_change=set_stacked_autorange,
+                args=["x"],
+            )
+            logger.debug(f"-> X Autorange: {stacked_settings.x_autorange}")
+
+            # If autorange is set to false and no range is available get the
+            # starting values for the range according to the automatic ones
+            if (
+                stacked_settings.x_autorange is False
+                and stacked_settings.x_range is None
+            ):
+                if full_layout is None:
+                    full_layout = get_full_layout(
+                        fingerprint,
+                        stacked_settings.x_range,
+                        stacked_settings.y_range,
+                        fig,
+                    )
+
+                stacked_settings = update_stacked_settings(
+                    x_range=get_axis_bounds(
+                        full_layout, "x", len(selected_experiments)
+                    )
+                )
+                logger.info(f"SET x range: {stacked_settings.x_range}")
+
+            # If the autorange is false get the user input about the desired range
+            # and save it in the sesison state
+            if stacked_settings.x_autorange is False:
+
+                xmin, xmax = stacked_settings.x_range
+                st.session_state["Page2_x_min"] = xmin
+                st.session_state["Page2_x_max"] = xmax
+                st.number_input(
+                    "X-min",
+                    step=0.01,
+                    key="Page2_x_min",
+                    on_change=set_stacked_range,
+                    args=["x"],
+                )
+                st.number_input(
+                    "X-max",
+                    step=0.01,
+                    key="Page2_x_max",
+                    on_change=set_stacked_range,
+                    args=["x"],
+                )
+
+            # If the autorange is false deactivate custom ticks
+            else:
+                stacked_settings = update_stacked_settings(
+                    custom_x_dticks=False
+                )
+
+            # Show a checkbox to enable custom axis tick
+            stacked_settings = update_stacked_settings(
+                custom_x_dticks=st.checkbox(
+                    "Use custom X ticks intervals",
+                    value=stacked_settings.custom_x_dticks,
+                    disabled=stacked_settings.x_autorange,
+                )
+            )
+            logger.info(
+                f"Use custom X ticks: {stacked_settings.custom_x_dticks}"
+            )
+
+            # If the custom tick option is enable get user input
+            if stacked_settings.custom_x_dticks:
+
+                # If no default value is set, compute one based on the range
+                if stacked_settings.x_dtick is None:
+                    x_range = stacked_settings.x_range
+                    stacked_settings = update_stacked_settings(
+                        x_dtick=float((x_range[1] - x_range[0]) / 10.0)
+                    )
+                    logger.debug(
+                        f"-> Setting X dtick default: {stacked_settings.x_dtick}"
+                    )
+
+                # Get user input
+                stacked_settings = update_stacked_settings(
+                    x_dtick=float(
+                        st.number_input(
+                            "X tick interval",
+                            value=stacked_settings.x_dtick,
+                            step=1e-3,
+                        )
+                    )
+                )
+                logger.info(f"SET X dtick: {stacked_settings.x_dtick}")
+
+            # If custom x dtick option is false celar the selected dtick value
+            elif stacked_settings.x_dtick is not None:
+                stacked_settings = update_stacked_settings(x_dtick=None)
+
+            st.markdown("Y-axis range")
+
+            # Show a checkbox to enable/disable automatic axis range
+            st.session_state["Page2_y_autorange"] = stacked_settings.y_autorange
+            st.checkbox(
+                "Use automatic range for Y",
+                key="Page2_y_autorange",
+                on_change=set_stacked_autorange,
+                args=["y"],
+            )
+            logger.debug(f"-> Y Autorange: {stacked_settings.y_autorange}")
+
+            # If autorange is set to false and no range is available get the
+            # starting values for the range according to the automatic ones
+            if (
+                stacked_settings.y_autorange is False
+                and stacked_settings.y_range is None
+            ):
+
+                if full_layout is None:
+                    full_layout = get_full_layout(
+                        fingerprint,
+                        stacked_settings.x_range,
+                        stacked_settings.y_range,
+                        fig,
+                    )
+
+                stacked_settings = update_stacked_settings(
+                    y_range=get_axis_bounds(
+                        full_layout, "y", len(selected_experiments)
+                    )
+                )
+
+            # If the autorange is false get the user input about the desired range
+            # and save it in the sesison state
+            if stacked_settings.y_autorange is False:
+
+                ymin, ymax = stacked_settings.y_range
+                st.session_state["Page2_y_min"] = ymin
+                st.session_state["Page2_y_max"] = ymax
+                st.number_input(
+                    "Y-min",
+                    step=0.01,
+                    key="Page2_y_min",
+                    on_change=set_stacked_range,
+                    args=["y"],
+                )
+                st.number_input(
+                    "Y-max",
+                    step=0.01,
+                    key="Page2_y_max",
+                    on_change=set_stacked_range,
+                    args=["y"],
+                )
+
+            # If the autorange is false deactivate custom ticks
+            else:
+                stacked_settings = update_stacked_settings(
+                    custom_y_dticks=False
+                )
+
+            # Show a checkbox to enable custom axis tick
+            stacked_settings = update_stacked_settings(
+                custom_y_dticks=st.checkbox(
+                    "Use custom Y ticks intervals",
+                    value=stacked_settings.custom_y_dticks,
+                    disabled=stacked_settings.y_autorange,
+                )
+            )
+            logger.info(
+                f"Use custom Y ticks: {stacked_settings.custom_y_dticks}"
+            )
+
+            # If the custom tick option is enable get user input
+            if stacked_settings.custom_y_dticks:
+
+                # If no default value is set, compute one based on the range
+                if stacked_settings.y_dtick is None:
+                    y_range = stacked_settings.y_range
+                    stacked_settings = update_stacked_settings(
+                        y_dtick=float((y_range[1] - y_range[0]) / 5)
+                    )
+
+                # Get user input
+                stacked_settings = update_stacked_settings(
+                    y_dtick=float(
+                        st.number_input(
+                            "Y tick interval",
+                            value=stacked_settings.y_dtick,
+                            step=1e-3,
+                        )
+                    )
+                )
+                logger.info(f"SET Y dtick: {stacked_settings.x_dtick}")
+
+            # If custom y dtick option is false celar the selected dtick value
+            elif stacked_settings.y_dtick is not None:
+                stacked_settings = update_stacked_settings(y_dtick=None)
+
+        with st.expander("Export options:"):
+            st.markdown("###### Export")
+            available_formats = ["png", "jpeg", "svg", "pdf"]
+            stacked_settings = update_stacked_settings(
+                format=st.selectbox(
+                    "Select the format of the file",
+                    available_formats,
+                    index=(
+                        available_formats.index(stacked_settings.format)
+                        if stacked_settings.format
+                        else 0
+                    ),
+                )
+            )
+            logger.debug(f"-> Export format: {stacked_settings.format}")
+
+            suggested_width = int(2.5 * stacked_settings.plot_height)
+            stacked_settings = update_stacked_settings(
+                total_width=int(
+                    st.number_input(
+                        "Total width",
+                        min_value=10,
+                        value=(
+                            stacked_settings.total_width
+                            if stacked_settings.total_width
+                            else suggested_width
+                        ),
+                    )
+                )
+            )
+            logger.debug(f"-> Export width: {stacked_settings.total_width}")
+
+            # Define a fingerprint of the plot and of the export settings used to check
+            # if a previously prepared image still matches the current figure
+            export_fingerprint = (fingerprint, stacked_settings)
+
+            # Render the image only when explicitly requested by the user (the image is
+            # cached and rendered again only if the figure or export settings change)
+            if st.button("Prepare download", key="stacked_prepare_download"):
+                logger.info("PREPARE cycle plot export")
+                st.session_state["Page2_stacked_export"] = (
+                    export_fingerprint,
+                    render_figure_image(
+                        fig.to_json(),
+                        stacked_settings.format,
+                        stacked_settings.total_width,
+                        stacked_settings.plot_height * len(selected_experiments.names),
+                    ),
+                )
+
+            # Discard the prepared image if it does not match the current plot
+            prepared_export = st.session_state.get("Page2_stacked_export")
+            if prepared_export is not None and prepared_export[0] != export_fingerprint:
+                del st.session_state["Page2_stacked_export"]
+                prepared_export = None
+
+            if prepared_export is not None:
+                st.download_button(
+                    "Download plot",
+                    data=prepared_export[1],
+                    file_name=f"cycle_plot.{stacked_settings.format}",
+                    on_click=lambda msg: logger.info(msg),
+                    args=[f"DOWNLOAD cycle_plot.{stacked_settings.format}"],
+                )
+
+
 try:
 
     logger.info("RUNNING cycles plotter page rendering")
 
+    # Wait for the experiment merge started by the file manager (if any) to complete
+    wait_for_experiment_merge(logger)
+
     # Check if the main page has set up the proper session state variables and check that at
     # least one experiment has been loaded
     enable = True
@@ -219,7 +1470,7 @@ try:
                             selection
                         )  # Set the experiment in the selector
                         logger.info(f"ADDED experiment {selection} to selection")
-                        st.experimental_rerun()  # Rerun the page to update the selector box
+                        st.rerun()  # Rerun the page to update the selector box
 
             st.markdown("---")
 
@@ -249,7 +1500,7 @@ try:
                         if remove_current:
                             logger.info("REMOVED {current_view} from view")
                             index = selected_experiments.remove(current_view)
-                            st.experimental_rerun()  # Rerun the page to update the GUI
+                            st.rerun()  # Rerun the page to update the GUI
 
                         st.markdown("---")
 
@@ -323,7 +1574,10 @@ try:
                             apply = st.button("✅ Apply", key="stacked_stride_apply")
                             if apply:
                                 logger.debug("-> Pressed apply button")
-                                cycles_in_view = np.arange(start, stop + 1, step=stride)
+                                # Convert the selected positions into cycle numbers
+                                cycles_in_view = status[id].cycle_numbers[
+                                    start : stop + 1 : stride
+                                ]
                                 selected_experiments.set(current_view, cycles_in_view)
                                 logger.info(f"SET view using cycles {cycles_in_view}")
 
@@ -359,7 +1613,7 @@ try:
                             # temporary buffer used on the proper rerun
                             buffer_selection = st.multiselect(
                                 "Select the cycles",
-                                [obj.number for obj in cycles],
+                                status[id].cycle_numbers,
                                 default=manual_selection_buffer,
                             )
                             buffer_selection.sort()  # Sort the traces automatically
@@ -376,7 +1630,7 @@ try:
                                     current_view,
                                     cycles=buffer_selection,
                                 )
-                                st.experimental_rerun()
+                                st.rerun()
 
                             # Print a remove all button to allow the user to remove alle the selected cycles
                             clear_current_view = st.button("🧹 Clear All")
@@ -384,7 +1638,7 @@ try:
                                 logger.info("Cleared selection buffer")
                                 selected_experiments.empty_view(current_view)
                                 clean_manual_selection_buffer()
-                                st.experimental_rerun()  # Rerun to update the GUI
+                                st.rerun()  # Rerun to update the GUI
 
                         else:
 
@@ -428,502 +1682,17 @@ try:
 
             # If there are selected experiment in the buffer start the plot operations
             if not selected_experiments.is_empty:
-
-                logger.info("Entering plot section")
-
-                col1, col2 = st.columns([4, 1])
-
-                # Visualize some plot options in a small coulomn on the right
-                with col2:
-
-                    logger.info("Entering plot option section")
-
-                    st.markdown("#### Plot options")
-
-                    with st.expander("Axis options:"):
-                        st.markdown("###### Axis")
-                        stacked_settings.x_axis = st.selectbox(
-                            "Select the series x axis",
-                            HALFCYCLE_SERIES,
-                            index=HALFCYCLE_SERIES.index(stacked_settings.x_axis)
-                            if stacked_settings.x_axis
-                            else 0,
-                        )
-                        logger.debug(f"-> X axis: {stacked_settings.x_axis}")
-
-                        sub_HALFCYCLE_SERIES = [
-                            x for x in HALFCYCLE_SERIES if x != stacked_settings.x_axis
-                        ]
-                        stacked_settings.y_axis = st.selectbox(
-                            "Select the series y axis",
-                            sub_HALFCYCLE_SERIES,
-                            index=sub_HALFCYCLE_SERIES.index(stacked_settings.y_axis)
-                            if stacked_settings.y_axis
-                            and stacked_settings.y_axis in sub_HALFCYCLE_SERIES
-                            else 0,
-                        )
-                        logger.debug(f"-> Y axis: {stacked_settings.y_axis}")
-
-                        stacked_settings.shared_x = st.checkbox(
-                            "Use shared x-axis",
-                            value=stacked_settings.shared_x
-                            if stacked_settings.shared_x and len(selected_experiments) == 1
-                            else False,
-                            disabled=True if len(selected_experiments) == 1 else False,
-                        )
-                        logger.debug(f"-> Shared X mode: {stacked_settings.shared_x}")
-
-                        volume_is_available = True
-                        for name in selected_experiments.view.keys():
-                            experiment_id = status.get_index_of(name)
-                            experiment = status[experiment_id]
-                            if experiment.volume is None:
-                                volume_is_available = False
-                                break
-
-                        stacked_settings.scale_by_volume = st.checkbox(
-                            "Scale values by volume",
-                            value=stacked_settings.scale_by_volume
-                            if volume_is_available
-                            else False,
-                            disabled=not volume_is_available,
-                        )
-                        logger.debug(
-                            f"-> Scale by volume: {stacked_settings.scale_by_volume}"
-                        )
-
-                        area_is_available = True
-                        for name in selected_experiments.view.keys():
-                            experiment_id = status.get_index_of(name)
-                            experiment = status[experiment_id]
-                            if experiment.area is None:
-                                area_is_available = False
-                                break
-
-                        stacked_settings.scale_by_area = st.checkbox(
-                            "Scale values by area",
-                            value=stacked_settings.scale_by_area
-                            if area_is_available
-                            else False,
-                            disabled=not area_is_available,
-                        )
-                        logger.debug(f"-> Scale by area: {stacked_settings.scale_by_area}")
-
-                    with st.expander("Series options:"):
-                        st.markdown("###### Series")
-                        stacked_settings.show_charge = st.checkbox(
-                            "Show charge", value=stacked_settings.show_charge
-                        )
-                        logger.debug(f"-> Show charge: {stacked_settings.show_charge}")
-
-                        stacked_settings.show_discharge = st.checkbox(
-                            "Show discharge", value=stacked_settings.show_discharge
-                        )
-                        logger.debug(
-                            f"-> Show discharge: {stacked_settings.show_discharge}"
-                        )
-
-                    with st.expander("Aspect options:"):
-                        st.markdown("###### Aspect")
-
-                        stacked_settings.reverse = st.checkbox(
-                            "Reversed colorscale",
-                            value=stacked_settings.reverse,
-                            key="stacked_reverse",
-                        )
-                        logger.debug(f"-> Reversed colorscale: {stacked_settings.reverse}")
-
-                        stacked_settings.font_size = int(
-                            st.number_input(
-                                "Label/tick font size",
-                                min_value=4,
-                                value=stacked_settings.font_size,
-                            )
-                        )
-                        logger.debug(
-                            f"-> Label/tick font size: {stacked_settings.font_size}"
-                        )
-
-                        stacked_settings.axis_font_size = int(
-                            st.number_input(
-                                "Axis title font size",
-                                min_value=4,
-                                value=stacked_settings.axis_font_size,
-                            )
-                        )
-                        logger.debug(
-                            f"-> Axis font size: {stacked_settings.axis_font_size}"
-                        )
-
-                        stacked_settings.plot_height = int(
-                            st.number_input(
-                                "Subplot height",
-                                min_value=10,
-                                value=stacked_settings.plot_height,
-                                step=10,
-                            )
-                        )
-                        logger.debug(f"-> Plot height: {stacked_settings.plot_height}")
-
-                with col1:
-
-                    logger.info("Entering plot rendering section")
-
-                    # Create a figure with a number of subplots equal to the numebr of selected experiments
-                    fig = make_subplots(
-                        cols=1,
-                        rows=len(selected_experiments),
-                        shared_xaxes=stacked_settings.shared_x,
-                        vertical_spacing=0 if stacked_settings.shared_x else None,
-                    )
-
-                    x_label, y_label = None, None
-
-                    # For eache experiment update the correspondent subplot
-                    for index, name in enumerate(selected_experiments.names):
-
-                        logger.debug(f"-> Plotting data for experiment {name}")
-
-                        # Get the cycle list from the experiment
-                        exp_id = status.get_index_of(name)
-                        experiment: Experiment = status[exp_id]
-                        cycles = experiment._cycles
-                        volume = (
-                            experiment.volume if stacked_settings.scale_by_volume else None
-                        )
-                        area = experiment.area if stacked_settings.scale_by_area else None
-
-                        # Get the user selected cycles and plot only the corresponden lines
-                        num_traces = len(selected_experiments[name])
-                        logger.debug(f"-> Number of traces: {num_traces}")
-
-                        for trace_id, cycle_id in enumerate(selected_experiments[name]):
-
-                            # Get the shade associated to the current trace
-                            shade = RGB_to_HEX(
-                                *experiment.color.get_shade(
-                                    trace_id, num_traces, reversed=stacked_settings.reverse
-                                )
-                            )
-
-                            # extract the cycle given the id selected
-                            cycle = cycles[cycle_id]
-
-                            # Print the charge halfcycle
-                            if (
-                                cycle.charge is not None
-                                and stacked_settings.show_charge is True
-                            ):
-
-                                series_name = selected_experiments.get_label(name, cycle_id)
-
-                                x_label, x_series = get_halfcycle_series(
-                                    cycle.charge, stacked_settings.x_axis, volume, area
-                                )
-                                y_label, y_series = get_halfcycle_series(
-                                    cycle.charge, stacked_settings.y_axis, volume, area
-                                )
-
-                                fig.add_trace(
-                                    go.Scatter(
-                                        x=x_series,
-                                        y=y_series,
-                                        line=dict(color=shade),
-                                        name=series_name,
-                                        mode="lines",
-                                    ),
-                                    row=index + 1,
-                                    col=1,
-                                )
-
-                            # Print the discharge halfcycle
-                            if (
-                                cycle.discharge is not None
-                                and stacked_settings.show_discharge is True
-                            ):
-
-                                series_name = selected_experiments.get_label(name, cycle_id)
-
-                                x_label, x_series = get_halfcycle_series(
-                                    cycle.discharge, stacked_settings.x_axis, volume, area
-                                )
-                                y_label, y_series = get_halfcycle_series(
-                                    cycle.discharge, stacked_settings.y_axis, volume, area
-                                )
-
-                                fig.add_trace(
-                                    go.Scatter(
-                                        x=x_series,
-                                        y=y_series,
-                                        line=dict(color=shade),
-                                        name=series_name,
-                                        showlegend=False if cycle.charge else True,
-                                        mode="lines",
-                                    ),
-                                    row=index + 1,
-                                    col=1,
-                                )
-
-                    if x_label and y_label:
-
-                        # Update the settings of the x-axis
-                        fig.update_xaxes(
-                            title_text=x_label,
-                            showline=True,
-                            linecolor="black",
-                            gridwidth=1,
-                            gridcolor="#DDDDDD",
-                            title_font={"size": stacked_settings.axis_font_size},
-                            range=stacked_settings.x_range,
-                            dtick=stacked_settings.x_dtick,
-                        )
-
-                        if stacked_settings.shared_x:
-                            for n in range(len(selected_experiments)):
-                                fig.update_xaxes(title_text="", row=n, col=1)
-
-                        # Update the settings of the y-axis
-                        fig.update_yaxes(
-                            title_text=y_label,
-                            showline=True,
-                            linecolor="black",
-                            gridwidth=1,
-                            gridcolor="#DDDDDD",
-                            title_font={"size": stacked_settings.axis_font_size},
-                            range=stacked_settings.y_range,
-                            dtick=stacked_settings.y_dtick,
-                        )
-
-                        # Update the settings of plot layout
-                        fig.update_layout(
-                            plot_bgcolor="#FFFFFF",
-                            height=stacked_settings.plot_height
-                            * len(selected_experiments.names),
-                            width=None,
-                            font=dict(size=stacked_settings.font_size),
-                        )
-
-                        st.plotly_chart(fig, use_container_width=True, theme=None)
-
-                with col2:
-
-                    logger.info("Re-Entering plot option section to render export section")
-
-                    # Define a expander to hold the options relative to the plot range and ticks
-                    with st.expander("Range/ticks options"):
-                        st.markdown("###### Range options")
-
-                        # Show a checkbox to enable/disable automatic axis range
-                        st.markdown("X-axis range")
-                        x_autorange = st.checkbox(
-                            "Use automatic range for X", value=stacked_settings.x_autorange
-                        )
-                        logger.debug(f"-> X Autorange: {x_autorange}")
-
-                        if x_autorange != stacked_settings.x_autorange:
-                            stacked_settings.x_autorange = x_autorange
-                            stacked_settings.x_range = None
-                            logger.info(f"X Autorange: {stacked_settings.x_autorange}")
-                            st.experimental_rerun()
-
-                        # If autorange is set to false and no range is available get the
-                        # starting values for the range according to the automatic ones
-                        if (
-                            stacked_settings.x_autorange is False
-                            and stacked_settings.x_range is None
-                        ):
-                            figure_data = fig.full_figure_for_development(warn=False)
-                            xmin, xmax = None, None
-                            for i in range(0, len(selected_experiments)):
-                                label = "xaxis" if i == 0 else f"xaxis{i+1}"
-                                xrange = [float(x) for x in figure_data.layout[label].range]
-                                xmin = xrange[0] if xmin is None else min(xmin, xrange[0])
-                                xmax = xrange[1] if xmax is None else max(xmax, xrange[1])
-                            stacked_settings.x_range = [float(xmin), float(xmax)]
-                            logger.info(f"SET x range: {stacked_settings.x_range}")
-
-                        # If the autorange is false get the user input about the desired range
-                        # and save it in the sesison state
-                        if stacked_settings.x_autorange is False:
-
-                            xmin, xmax = stacked_settings.x_range
-                            xmin = float(st.number_input("X-min", value=xmin, step=0.01))
-                            xmax = float(st.number_input("X-max", value=xmax, step=0.01))
-                            xrange = [xmin, xmax]
-
-                            if xrange != stacked_settings.x_range:
-                                stacked_settings.x_range = xrange
-                                logger.info(f"SET x range: {stacked_settings.x_range}")
-                                st.experimental_rerun()
-
-                        # If the autorange is false deactivate custom ticks
-                        else:
-                            stacked_settings.custom_x_dticks = False
-
-                        # Show a checkbox to enable custom axis tick
-                        stacked_settings.custom_x_dticks = st.checkbox(
-                            "Use custom X ticks intervals",
-                            value=stacked_settings.custom_x_dticks,
-                            disabled=stacked_settings.x_autorange,
-                        )
-                        logger.info(
-                            f"Use custom X ticks: {stacked_settings.custom_x_dticks}"
-                        )
-
-                        # If the custom tick option is enable get user input
-                        if stacked_settings.custom_x_dticks:
-
-                            # If no default value is set, compute one based on the range
-                            if stacked_settings.x_dtick is None:
-                                x_range = stacked_settings.x_range
-                                stacked_settings.x_dtick = float(
-                                    (x_range[1] - x_range[0]) / 10.0
-                                )
-                                logger.debug(
-                                    f"-> Setting X dtick default: {stacked_settings.x_dtick}"
-                                )
-
-                            # Get user input
-                            stacked_settings.x_dtick = float(
-                                st.number_input(
-                                    "X tick interval",
-                                    value=stacked_settings.x_dtick,
-                                    step=1e-3,
-                                )
-                            )
-                            logger.info(f"SET X dtick: {stacked_settings.x_dtick}")
-
-                        # If custom x dtick option is false celar the selected dtick value
-                        elif stacked_settings.x_dtick is not None:
-                            stacked_settings.x_dtick = None
-
-                        st.markdown("Y-axis range")
-
-                        # Show a checkbox to enable/disable automatic axis range
-                        y_autorange = st.checkbox(
-                            "Use automatic range for Y", value=stacked_settings.y_autorange
-                        )
-                        logger.debug(f"-> Y Autorange: {y_autorange}")
-
-                        if y_autorange != stacked_settings.y_autorange:
-                            stacked_settings.y_autorange = y_autorange
-                            stacked_settings.y_range = None
-                            logger.info(f"Y Autorange: {stacked_settings.y_autorange}")
-                            st.experimental_rerun()
-
-                        # If autorange is set to false and no range is available get the
-                        # starting values for the range according to the automatic ones
-                        if (
-                            stacked_settings.y_autorange is False
-                            and stacked_settings.y_range is None
-                        ):
-
-                            figure_data = fig.full_figure_for_development(warn=False)
-
-                            ymin, ymax = None, None
-                            for i in range(len(selected_experiments)):
-                                label = "yaxis" if i == 0 else f"yaxis{i+1}"
-                                yrange = [float(y) for y in figure_data.layout[label].range]
-                                ymin = yrange[0] if ymin is None else min(ymin, yrange[0])
-                                ymax = yrange[1] if ymax is None else max(ymax, yrange[1])
-                            stacked_settings.y_range = [float(ymin), float(ymax)]
-
-                        # If the autorange is false get the user input about the desired range
-                        # and save it in the sesison state
-                        if stacked_settings.y_autorange is False:
-
-                            ymin, ymax = stacked_settings.y_range
-                            ymin = float(st.number_input("Y-min", value=ymin, step=0.01))
-                            ymax = float(st.number_input("Y-max", value=ymax, step=0.01))
-                            yrange = [ymin, ymax]
-
-                            if yrange != stacked_settings.y_range:
-                                stacked_settings.y_range = yrange
-                                logger.info(f"Y range set to: {stacked_settings.y_range}")
-                                st.experimental_rerun()
-
-                        # If the autorange is false deactivate custom ticks
-                        else:
-                            stacked_settings.custom_y_dticks = False
-
-                        # Show a checkbox to enable custom axis tick
-                        stacked_settings.custom_y_dticks = st.checkbox(
-                            "Use custom Y ticks intervals",
-                            value=stacked_settings.custom_y_dticks,
-                            disabled=stacked_settings.y_autorange,
-                        )
-                        logger.info(
-                            f"Use custom Y ticks: {stacked_settings.custom_y_dticks}"
-                        )
-
-                        # If the custom tick option is enable get user input
-                        if stacked_settings.custom_y_dticks:
-
-                            # If no default value is set, compute one based on the range
-                            if stacked_settings.y_dtick is None:
-                                y_range = stacked_settings.y_range
-                                stacked_settings.y_dtick = float(
-                                    (y_range[1] - y_range[0]) / 5
-                                )
-
-                            # Get user input
-                            stacked_settings.y_dtick = float(
-                                st.number_input(
-                                    "Y tick interval",
-                                    value=stacked_settings.y_dtick,
-                                    step=1e-3,
-                                )
-                            )
-                            logger.info(f"SET Y dtick: {stacked_settings.x_dtick}")
-
-                        # If custom y dtick option is false celar the selected dtick value
-                        elif stacked_settings.y_dtick is not None:
-                            stacked_settings.y_dtick = None
-
-                    with st.expander("Export options:"):
-                        st.markdown("###### Export")
-                        available_formats = ["png", "jpeg", "svg", "pdf"]
-                        stacked_settings.format = st.selectbox(
-                            "Select the format of the file",
-                            available_formats,
-                            index=available_formats.index(stacked_settings.format)
-                            if stacked_settings.format
-                            else 0,
-                        )
-                        logger.debug(f"-> Export format: {stacked_settings.format}")
-
-                        suggested_width = int(2.5 * stacked_settings.plot_height)
-                        stacked_settings.total_width = int(
-                            st.number_input(
-                                "Total width",
-                                min_value=10,
-                                value=stacked_settings.total_width
-                                if stacked_settings.total_width
-                                else suggested_width,
-                            )
-                        )
-                        logger.debug(f"-> Export width: {stacked_settings.total_width}")
-
-                        # Set new layout options to account for the user selected width
-                        fig.update_layout(
-                            plot_bgcolor="#FFFFFF",
-                            height=stacked_settings.plot_height
-                            * len(selected_experiments.names),
-                            width=stacked_settings.total_width,
-                            font=dict(size=stacked_settings.font_size),
-                        )
-
-                        st.download_button(
-                            "Download plot",
-                            data=fig.to_image(format=stacked_settings.format),
-                            file_name=f"cycle_plot.{stacked_settings.format}",
-                            on_click=lambda msg: logger.info(msg),
-                            args=[f"DOWNLOAD cycle_plot.{stacked_settings.format}"],
-                            disabled=True
-                            if not stacked_settings.show_charge
-                            and not stacked_settings.show_discharge
-                            else False,
-                        )
+                render_stacked_plot()
+
+            # Else release the last figure and export stored in the session state
+            else:
+                for key in [
+                    "Page2_last_fp",
+                    "Page2_last_fig",
+                    "Page2_last_labels",
+                    "Page2_stacked_export",
+                ]:
+                    st.session_state.pop(key, None)
 
         # Define a comparison plot tab to compare cycle belonging to different experiments
         with comparison_plot:
@@ -946,7 +1715,7 @@ try:
                     )
                     exp_idx = status.get_index_of(experiment_name)
                     experiment = status[exp_idx]
-                    cycle_numbers = [obj.number for obj in experiment._cycles]
+                    cycle_numbers = experiment.cycle_numbers
 
                     logger.debug(f"-> Selected experiment: {experiment_name}")
 
@@ -968,7 +1737,7 @@ try:
                             f"REMOVING experiment {experiment_name} from selection buffer"
                         )
                         remove_experiment_from_series_buffer(experiment_name)
-                        st.experimental_rerun()
+                        st.rerun()
 
                 with col2:
                     if selector_mode == "Stride based selector" and len(cycle_numbers) > 1:
@@ -1027,34 +1796,26 @@ try:
                         if apply:
                             logger.debug("-> Pressed apply button")
 
+                            # Replace the series of the experiment with the cycles found
+                            # at the selected positions (the numbers are unique, so no
+                            # duplicate check is needed)
                             remove_experiment_from_series_buffer(experiment_name)
-
-                            cycles_in_selection = np.arange(start, stop + 1, step=stride)
-                            for n in cycles_in_selection:
-                                cycle = experiment._cycles[cycle_numbers.index(n)]
-
-                                duplicate = False
-                                for series in selected_series:
-                                    if (
-                                        series.experiment_name == experiment_name
-                                        and series.cycle_id == n
-                                    ):
-                                        duplicate = True
-                                        break
-                                if duplicate:
-                                    continue
-
-                                selected_series.append(
-                                    SingleCycleSeries(
-                                        f"{label_prefix} [{n}]",
-                                        experiment_name,
-                                        n,
-                                        hex_color=get_plotly_color(len(selected_series)),
-                                        color_from_base=use_base_color,
-                                    )
+                            new_ids = cycle_numbers[start : stop + 1 : stride]
+
+                            # Append the new series with the following colors of the palette
+                            colors = get_plotly_colors(len(selected_series), len(new_ids))
+                            selected_series.extend(
+                                SingleCycleSeries(
+                                    f"{label_prefix} [{n}]",
+                                    experiment_name,
+                                    n,
+                                    hex_color=color,
+                                    color_from_base=use_base_color,
                                 )
+                                for n, color in zip(new_ids, colors)
+                            )
                             # logger.info(f"Selection buffer set to: {selected_series}")
-                            st.experimental_rerun()
+                            st.rerun()
 
                     elif selector_mode == "Stride based selector":
                         st.info(
@@ -1071,18 +1832,20 @@ try:
                         multiple = st.checkbox("Use multiple selection", value=True)
                         logger.debug(f"-> Multiple selector set to: {multiple}")
 
-                        exclude = [
+                        # Get the cycles of the experiment not already in the buffer
+                        exclude = {
                             entry.cycle_id
                             for entry in selected_series
                             if entry.experiment_name == experiment_name
-                        ]
+                        }
+                        available_cycles = [n for n in cycle_numbers if n not in exclude]
 
                         selected_cycles = {}
                         if multiple:
                             logger.info("Entering multiple cycle selector")
                             cycle_numbers = st.multiselect(
                                 "Select the cycle",
-                                [n for n in cycle_numbers if n not in exclude],
+                                available_cycles,
                             )
                             logger.debug(f"-> Selected cycles: {cycle_numbers}")
 
@@ -1099,7 +1862,7 @@ try:
                             logger.info("Entering single cycle selector")
                             cycle_number = st.selectbox(
                                 "Select the cycle",
-                                [n for n in cycle_numbers if n not in exclude],
+                                available_cycles,
                             )
                             logger.debug(f"-> Selected cycle: {cycle_number}")
 
@@ -1113,24 +1876,26 @@ try:
                         add = st.button("➕ Add", key="comparison")
 
                         if add:
-                            for label, n in selected_cycles.items():
+                            colors = get_plotly_colors(
+                                len(selected_series), len(selected_cycles)
+                            )
+                            for (label, n), color in zip(selected_cycles.items(), colors):
 
                                 logger.info(
                                     f"ADD cycle {n} from experiment {experiment_name} to comparison plot"
                                 )
 
-                                cycle = experiment._cycles[cycle_numbers.index(n)]
                                 selected_series.append(
                                     SingleCycleSeries(
                                         label,
                                         experiment_name,
                                         n,
-                                        hex_color=get_plotly_color(len(selected_series)),
+                                        hex_color=color,
                                         color_from_base=use_base_color,
                                     )
                                 )
 
-                            st.experimental_rerun()
+                            st.rerun()
 
                     elif selector_mode == "Series editor":
 
@@ -1159,7 +1924,7 @@ try:
                             if remove:
                                 logger.info(f"REMOVED series {series_label} form selection")
                                 del selected_series[series_position]
-                                st.experimental_rerun()
+                                st.rerun()
 
                             logger.info("Entering series edit menu")
                             st.markdown("##### Options:")
@@ -1191,7 +1956,7 @@ try:
                                 current_series.hex_color = new_color
                                 if override_color:
                                     current_series.color_from_base = False
-                                st.experimental_rerun()
+                                st.rerun()
 
                         else:
                             logger.debug(f"-> No series found")
@@ -1205,6 +1970,11 @@ try:
             # Enter the plot section
             if selected_series != []:
 
+                # Get the mapping between experiment names and experiment objects and the
+                # names of the experiments with at least one selected series
+                exp_by_name: Dict[str, Experiment] = status.get_experiment_map()
+                selected_names = {series.experiment_name for series in selected_series}
+
                 col1, col2 = st.columns([4, 1])
 
                 # Create a small column on the right to allow the user to set some properties of
@@ -1217,67 +1987,77 @@ try:
 
                     with st.expander("Axis options:"):
                         st.markdown("###### Axis")
-                        comparison_settings.x_axis = st.selectbox(
-                            "Select the series x axis",
-                            HALFCYCLE_SERIES,
-                            key="x_comparison",
-                            index=HALFCYCLE_SERIES.index(comparison_settings.x_axis)
-                            if comparison_settings.x_axis
-                            else 0,
+                        comparison_settings = update_comparison_settings(
+                            x_axis=st.selectbox(
+                                "Select the series x axis",
+                                HALFCYCLE_SERIES,
+                                key="x_comparison",
+                                index=(
+                                    HALFCYCLE_INDEX[comparison_settings.x_axis]
+                                    if comparison_settings.x_axis
+                                    else 0
+                                ),
+                            )
                         )
                         logger.debug(f"-> X axis: {comparison_settings.x_axis}")
 
-                        sub_HALFCYCLE_SERIES = [
-                            element
-                            for element in HALFCYCLE_SERIES
-                            if element != comparison_settings.x_axis
+                        sub_HALFCYCLE_SERIES = SUB_HALFCYCLE_SERIES[
+                            comparison_settings.x_axis
                         ]
-                        comparison_settings.y_axis = st.selectbox(
-                            "Select the series y axis",
-                            sub_HALFCYCLE_SERIES,
-                            index=sub_HALFCYCLE_SERIES.index(comparison_settings.y_axis)
-                            if comparison_settings.y_axis
-                            and comparison_settings.y_axis in sub_HALFCYCLE_SERIES
-                            else 0,
-                            key="y_comparison",
+                        comparison_settings = update_comparison_settings(
+                            y_axis=st.selectbox(
+                                "Select the series y axis",
+                                sub_HALFCYCLE_SERIES,
+                                index=(
+                                    sub_HALFCYCLE_SERIES.index(
+                                        comparison_settings.y_axis
+                                    )
+                                    if comparison_settings.y_axis
+                                    and comparison_settings.y_axis
+                                    in sub_HALFCYCLE_SERIES
+                                    else 0
+                                ),
+                                key="y_comparison",
+                            )
                         )
                         logger.debug(f"-> Y axis: {comparison_settings.y_axis}")
 
-                        volume_is_available = True
-                        for series in selected_series:
-                            experiment_id = status.get_index_of(series.experiment_name)
-                            experiment = status[experiment_id]
-                            if experiment.volume is None:
-                                volume_is_available = False
-                                break
-
-                        comparison_settings.scale_by_volume = st.checkbox(
-                            "Scale values by volume",
-                            value=comparison_settings.scale_by_volume
-                            if volume_is_available
-                            else False,
-                            disabled=not volume_is_available,
-                            key="comparison_plot",
+                        volume_is_available = all(
+                            exp_by_name[name].volume is not None
+                            for name in selected_names
+                        )
+
+                        comparison_settings = update_comparison_settings(
+                            scale_by_volume=st.checkbox(
+                                "Scale values by volume",
+                                value=(
+                                    comparison_settings.scale_by_volume
+                                    if volume_is_available
+                                    else False
+                                ),
+                                disabled=not volume_is_available,
+                                key="comparison_plot",
+                            )
                         )
                         logger.debug(
                             f"-> Scale by volume: {comparison_settings.scale_by_volume}"
                         )
 
-                        area_is_available = True
-                        for series in selected_series:
-                            experiment_id = status.get_index_of(series.experiment_name)
-                            experiment = status[experiment_id]
-                            if experiment.area is None:
-                                area_is_available = False
-                                break
-
-                        comparison_settings.scale_by_area = st.checkbox(
-                            "Scale values by area",
-                            value=comparison_settings.scale_by_area
-                            if area_is_available
-                            else False,
-                            disabled=not area_is_available,
-                            key="by_area_comparison",
+                        area_is_available = all(
+                            exp_by_name[name].area is not None for name in selected_names
+                        )
+
+                        comparison_settings = update_comparison_settings(
+                            scale_by_area=st.checkbox(
+                                "Scale values by area",
+                                value=(
+                                    comparison_settings.scale_by_area
+                                    if area_is_available
+                                    else False
+                                ),
+                                disabled=not area_is_available,
+                                key="by_area_comparison",
+                            )
                         )
                         logger.debug(
                             f"-> Scale by area: {comparison_settings.scale_by_area}"
@@ -1285,46 +2065,56 @@ try:
 
                     with st.expander("Plot aspect options:"):
                         st.markdown("###### Aspect")
-                        comparison_settings.font_size = int(
-                            st.number_input(
-                                "Label/tick font size",
-                                min_value=4,
-                                value=comparison_settings.font_size,
-                                key="font_size_comparison",
+                        comparison_settings = update_comparison_settings(
+                            font_size=int(
+                                st.number_input(
+                                    "Label/tick font size",
+                                    min_value=4,
+                                    value=comparison_settings.font_size,
+                                    key="font_size_comparison",
+                                )
                             )
                         )
                         logger.debug(
                             f"-> Label/tick font size: {comparison_settings.font_size}"
                         )
 
-                        comparison_settings.axis_font_size = int(
-                            st.number_input(
-                                "Axis title font size",
-                                min_value=4,
-                                value=comparison_settings.axis_font_size,
-                                key="axis_font_size_comparison",
+                        comparison_settings = update_comparison_settings(
+                            axis_font_size=int(
+                                st.number_input(
+                                    "Axis title font size",
+                                    min_value=4,
+                                    value=comparison_settings.axis_font_size,
+                                    key="axis_font_size_comparison",
+                                )
                             )
                         )
                         logger.debug(
                             f"-> Axis title font size: {comparison_settings.axis_font_size}"
                         )
 
-                        comparison_settings.reverse = st.checkbox(
-                            "Use reversed experiment-based colorscale",
-                            value=comparison_settings.reverse,
+                        comparison_settings = update_comparison_settings(
+                            reverse=st.checkbox(
+                                "Use reversed experiment-based colorscale",
+                                value=comparison_settings.reverse,
+                            )
                         )
                         logger.debug(
                             f"-> Reversed colorscale: {comparison_settings.reverse}"
                         )
 
-                        comparison_settings.height = int(
-                            st.number_input(
-                                "Plot height",
-                                min_value=10,
-                                value=comparison_settings.height
-                                if comparison_settings.height
-                                else 800,
-                                step=10,
+                        comparison_settings = update_comparison_settings(
+                            height=int(
+                                st.number_input(
+                                    "Plot height",
+                                    min_value=10,
+                                    value=(
+                                        comparison_settings.height
+                                        if comparison_settings.height
+                                        else 800
+                                    ),
+                                    step=10,
+                                )
                             )
                         )
                         logger.debug(f"-> Plot height: {comparison_settings.height}")
@@ -1333,119 +2123,82 @@ try:
 
                     logger.info("Entering plot rendering section")
 
-                    # Create a figure with a single plo
-                    fig = make_subplots(cols=1, rows=1)
+                    # Read the fields of each selected series once
+                    series_fields = [
+                        (
+                            entry.label,
+                            entry.experiment_name,
+                            entry.cycle_id,
+                            entry.hex_color,
+                            entry.color_from_base,
+                        )
+                        for entry in selected_series
+                    ]
 
-                    # Generate a list of all the currently loaded series associated to a given
-                    # experiment in order to calculate the shadow of color to be used when the
+                    # Map, for each experiment, the cycles of the currently loaded series to their
+                    # position in order to calculate the shadow of color to be used when the
                     # color_from_base option is selected
-                    experiment_based_selection: Dict[str, List[int]] = {}
-                    for entry in selected_series:
-                        exp_name = entry.experiment_name
-                        if exp_name not in experiment_based_selection:
-                            experiment_based_selection[exp_name] = [entry.cycle_id]
+                    experiment_based_selection: Dict[str, Dict[int, int]] = {}
+                    for _, name, cycle_id, _, _ in series_fields:
+                        positions = experiment_based_selection.setdefault(name, {})
+                        positions.setdefault(cycle_id, len(positions))
+
+                    # Define the signature of the series to be plotted, including the color of
+                    # each series and the volume and area used for scaling (None if no scaling
+                    # is required)
+                    series_signature = []
+                    for label, name, cycle_id, hex_color, from_base in series_fields:
+
+                        experiment = exp_by_name[name]
+
+                        # Get the shade associated to the cycle of a given experiment
+                        if from_base is False:
+                            color = hex_color
                         else:
-                            experiment_based_selection[exp_name].append(entry.cycle_id)
-
-                    # For each selected series add an independent trace to the plot
-                    for entry in selected_series:
-
-                        logger.debug(f"-> Plotting data for series {entry.label}")
-
-                        name = entry.experiment_name
-                        cycle_id = entry.cycle_id
-
-                        exp_idx = status.get_index_of(name)
-                        experiment = status[exp_idx]
-                        cycle = experiment._cycles[cycle_id]
-
-                        label = entry.label
-
-                        # Compute the shade associated to the cycle of a given experiment
-                        trace_id = experiment_based_selection[name].index(cycle_id)
-                        num_traces = len(experiment_based_selection[name])
-                        shade = RGB_to_HEX(
-                            *experiment.color.get_shade(
-                                trace_id, num_traces, reversed=comparison_settings.reverse
-                            )
-                        )
-                        color = entry.hex_color if entry.color_from_base is False else shade
-
-                        volume = (
-                            status[exp_idx].volume
-                            if comparison_settings.scale_by_volume
-                            else None
-                        )
-                        area = (
-                            status[exp_idx].area
-                            if comparison_settings.scale_by_area
-                            else None
-                        )
-
-                        # Print the charge halfcycle
-                        if cycle.charge is not None:
-
-                            x_label, x_series = get_halfcycle_series(
-                                cycle.charge, comparison_settings.x_axis, volume, area
+                            positions = experiment_based_selection[name]
+                            shades = get_HEX_shades(
+                                experiment.color.get_RGB(),
+                                len(positions),
+                                comparison_settings.reverse,
                             )
-                            y_label, y_series = get_halfcycle_series(
-                                cycle.charge, comparison_settings.y_axis, volume, area
-                            )
-
-                            fig.add_trace(
-                                go.Scatter(
-                                    x=x_series,
-                                    y=y_series,
-                                    line=dict(color=color),
-                                    name=label,
-                                    mode="lines",
-                                ),
-                                row=1,
-                                col=1,
-                            )
-
-                        # Print the discharge halfcycle
-                        if cycle.discharge is not None:
-
-                            x_label, x_series = get_halfcycle_series(
-                                cycle.discharge, comparison_settings.x_axis, volume, area
-                            )
-                            y_label, y_series = get_halfcycle_series(
-                                cycle.discharge, comparison_settings.y_axis, volume, area
+                            color = shades[positions[cycle_id]]
+
+                        series_signature.append(
+                            (
+                                label,
+                                name,
+                                experiment.revision,
+                                cycle_id,
+                                color,
+                                experiment.volume
+                                if comparison_settings.scale_by_volume
+                                else None,
+                                experiment.area if comparison_settings.scale_by_area else None,
                             )
+                        )
 
-                            fig.add_trace(
-                                go.Scatter(
-                                    x=x_series,
-                                    y=y_series,
-                                    line=dict(color=color),
-                                    name=label,
-                                    showlegend=False if cycle.charge else True,
-                                    mode="lines",
-                                ),
-                                row=1,
-                                col=1,
-                            )
+                    series_signature = tuple(series_signature)
 
-                    # Update the settings of the x-axis
-                    fig.update_xaxes(
-                        title_text=x_label,
-                        showline=True,
-                        linecolor="black",
-                        gridwidth=1,
-                        gridcolor="#DDDDDD",
-                        title_font={"size": comparison_settings.axis_font_size},
+                    # Build (or fetch from cache) the figure with all the traces. Reruns
+                    # triggered by aspect-only options reuse the already built figure
+                    fig, x_label, y_label = build_comparison_figure(
+                        series_signature,
+                        (comparison_settings.x_axis, comparison_settings.y_axis),
+                        exp_by_name,
                     )
 
-                    # Update the settings of the y-axis
-                    fig.update_yaxes(
-                        title_text=y_label,
-                        showline=True,
-                        linecolor="black",
-                        gridwidth=1,
-                        gridcolor="#DDDDDD",
-                        title_font={"size": comparison_settings.axis_font_size},
-                    )
+                    # Define the settings shared by the x and y axis
+                    axis_settings = {
+                        "showline": True,
+                        "linecolor": "black",
+                        "gridwidth": 1,
+                        "gridcolor": "#DDDDDD",
+                        "title_font": {"size": comparison_settings.axis_font_size},
+                    }
+
+                    # Update the settings of the x and y axis
+                    fig.update_xaxes(title_text=x_label, **axis_settings)
+                    fig.update_yaxes(title_text=y_label, **axis_settings)
 
                     # Update the settings of plot layout
                     fig.update_layout(
@@ -1453,6 +2206,7 @@ try:
                         height=comparison_settings.height,
                         width=None,
                         font=dict(size=comparison_settings.font_size),
+                        legend=dict(groupclick="toggleitem"),
                     )
 
                     st.plotly_chart(fig, use_container_width=True, theme=None)
@@ -1464,41 +2218,78 @@ try:
                     # Add to the right column the export option
                     with st.expander("Export options"):
                         st.markdown("###### Export")
-                        available_formats = ["png", "jpeg", "svg", "pdf"]
-                        comparison_settings.format = st.selectbox(
-                            "Select the format of the file",
-                            available_formats,
-                            index=available_formats.index(comparison_settings.format)
-                            if comparison_settings.format
-                            else 0,
-                            key="format_comparison",
+                        available_formats = ["png", "jpeg", "svg", "pdf", "html"]
+                        comparison_settings = update_comparison_settings(
+                            format=st.selectbox(
+                                "Select the format of the file",
+                                available_formats,
+                                index=(
+                                    available_formats.index(comparison_settings.format)
+                                    if comparison_settings.format
+                                    else 0
+                                ),
+                                key="format_comparison",
+                            )
                         )
                         logger.debug(f"-> Export format {comparison_settings.format}")
 
-                        comparison_settings.width = int(
-                            st.number_input(
-                                "Plot width",
-                                min_value=10,
-                                value=comparison_settings.width,
+                        comparison_settings = update_comparison_settings(
+                            width=int(
+                                st.number_input(
+                                    "Plot width",
+                                    min_value=10,
+                                    value=comparison_settings.width,
+                                )
                             )
                         )
                         logger.debug(f"-> Plot width {comparison_settings.width}")
 
-                        # Update the settings of plot layout to account for the user define width
-                        fig.update_layout(
-                            plot_bgcolor="#FFFFFF",
-                            height=comparison_settings.height,
-                            width=comparison_settings.width,
-                            font=dict(size=comparison_settings.font_size),
-                        )
+                        # Define a fingerprint of the plot and of the export settings used to check
+                        # if a previously prepared image still matches the current figure
+                        export_fingerprint = (series_signature, comparison_settings)
+
+                        # Render the image with the user defined width only when explicitly
+                        # requested by the user (the image is cached and rendered again only
+                        # if the figure or the export settings change). The interactive HTML
+                        # export does not require Kaleido and is generated directly
+                        if st.button("Prepare download", key="comparison_prepare_download"):
+                            logger.info("PREPARE cycle comparison plot export")
+                            if comparison_settings.format == "html":
+                                data = fig.to_html(
+                                    include_plotlyjs="cdn",
+                                    full_html=True,
+                                    default_width=comparison_settings.width,
+                                    default_height=comparison_settings.height,
+                                )
+                            else:
+                                data = render_figure_image(
+                                    fig.to_json(),
+                                    comparison_settings.format,
+                                    comparison_settings.width,
+                                    comparison_settings.height,
+                                )
+                            st.session_state["Page2_comparison_export"] = (
+                                export_fingerprint,
+                                data,
+                            )
 
-                        st.download_button(
-                            "Download plot",
-                            data=fig.to_image(format=comparison_settings.format),
-                            file_name=f"cycle_comparison_plot.{comparison_settings.format}",
-                            on_click=lambda msg: logger.info(msg),
-                            args=[f"DOWNLOAD cycle_plot.{comparison_settings.format}"],
-                        )
+                        # Discard the prepared image if it does not match the current plot
+                        prepared_export = st.session_state.get("Page2_comparison_export")
+                        if (
+                            prepared_export is not None
+                            and prepared_export[0] != export_fingerprint
+                        ):
+                            del st.session_state["Page2_comparison_export"]
+                            prepared_export = None
+
+                        if prepared_export is not None:
+                            st.download_button(
+                                "Download plot",
+                                data=prepared_export[1],
+                                file_name=f"cycle_comparison_plot.{comparison_settings.format}",
+                                on_click=lambda msg: logger.info(msg),
+                                args=[f"DOWNLOAD cycle_plot.{comparison_settings.format}"],
+                            )
 
     # If there are no experiments in the buffer suggest to the user to load data form the main page
     else:
@@ -1517,18 +2308,9 @@ except st.runtime.scriptrunner.script_runner.RerunException:
 
 except:
     logger.exception(
-        f"Unexpected exception occurred during cycles plotter page execution:\n\n {traceback.print_exception(*sys.exc_info())}"
+        "Unexpected exception occurred during cycles plotter page execution"
     )
-    dump_index = 0
-    while True:
-        dump_file = f"./GES_echem_gui_dump_{dump_index}.pickle"
-        if os.path.isfile(dump_file):
-            dump_index += 1
-        else:
-            logger.critical(f"Dumping the content of the session state to '{dump_file}'")
-            with open(dump_file, "wb") as file:
-                pickle.dump(dict(st.session_state), file, protocol=pickle.HIGHEST_PROTOCOL)
-            break
+    dump_session_state(logger)
     raise
 
 else:
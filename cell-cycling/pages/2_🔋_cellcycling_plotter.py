@@ -1,4 +1,4 @@
-import sys, os, logging, traceback, pickle
+import logging
 from typing import Dict, List, Tuple, Union
 import streamlit as st
 import plotly.graph_objects as go
@@ -7,7 +7,12 @@ from streamlit_plotly_events import plotly_events
 
 from core.gui_core import ProgramStatus, CellcyclingPlotSettings
 from core.experiment import Experiment, ExperimentContainer
-from core.utils import set_production_page_style, force_update_once
+from core.utils import (
+    set_production_page_style,
+    force_update_once,
+    dump_session_state,
+    wait_for_experiment_merge,
+)
 from core.colors import get_plotly_color
 
 
@@ -193,7 +198,7 @@ def cell_cycling_plotter_widget(
                 else:
                     annotation = st.selectbox(
                         "Select annotation",
-                        [text for text in plot_settings.annotations.keys()],
+                        list(plot_settings.annotations),
                         key=f"annotation_select_{unique_id}",
                     )
                 logger.debug(f"-> Annotation: {annotation}")
@@ -248,7 +253,7 @@ def cell_cycling_plotter_widget(
                 if remove:
                     logger.info(f"REMOVE annotation: '{annotation}'")
                     del plot_settings.annotations[annotation]
-                    st.experimental_rerun()
+                    st.rerun()
 
             if apply or mode == "Edit existing":
                 if annotation is not None and annotation != "":
@@ -365,7 +370,7 @@ def cell_cycling_plotter_widget(
         with st.expander("Graph options"):
             st.markdown("###### Graph options")
 
-            available_MARKERS = [m for m in MARKERS.keys()]
+            available_MARKERS = list(MARKERS)
             plot_settings.primary_axis_marker = st.selectbox(
                 "Select primary Y axis markers",
                 available_MARKERS,
@@ -377,7 +382,7 @@ def cell_cycling_plotter_widget(
             logger.debug(f"-> Primary axis marker: {plot_settings.primary_axis_marker}")
 
             available_MARKERS = [
-                m for m in MARKERS.keys() if m != plot_settings.primary_axis_marker
+                m for m in MARKERS if m != plot_settings.primary_axis_marker
             ]
             plot_settings.secondary_axis_marker = st.selectbox(
                 "Select secondary Y axis markers",
@@ -639,14 +644,14 @@ def cell_cycling_plotter_widget(
                     )
                     available_containers[container_idx].hide_cycle(selected_point["x"])
 
-                st.experimental_rerun()
+                st.rerun()
 
         # Render a referesh button to manually trigger a rerun
         with crefresh:
             refresh = st.button("♻ Refresh", key=f"refresh_{unique_id}")
 
             if refresh:
-                st.experimental_rerun()
+                st.rerun()
 
         # Evaluate the current plot limits
         xrange = (
@@ -695,7 +700,7 @@ def cell_cycling_plotter_widget(
             logger.debug(
                 f"-> Limits: x={plot_settings.limits['x']}, y1={plot_settings.limits['y']}, y2={plot_settings.limits['y2']}"
             )
-            st.experimental_rerun()
+            st.rerun()
 
     with col2:
 
@@ -734,7 +739,7 @@ def cell_cycling_plotter_widget(
                 ):
                     plot_settings.limits["y"] = [y1_min, y1_max]
                     logger.info(f"Setting Y limits to {plot_settings.limits['y']}")
-                    st.experimental_rerun()
+                    st.rerun()
 
             if plot_settings.y_axis_mode != "Only primary":
                 st.markdown("###### secondary Y-axis range")
@@ -765,7 +770,7 @@ def cell_cycling_plotter_widget(
                 ):
                     plot_settings.limits["y2"] = [y2_min, y2_max]
                     logger.info(f"Setting Y2 limits to {plot_settings.limits['y2']}")
-                    st.experimental_rerun()
+                    st.rerun()
 
         # Add an export option
         with st.expander("Export"):
@@ -825,6 +830,9 @@ try:
 
     logger.info("RUNNING cell-cycling plotter page rendering")
 
+    # Wait for the experiment merge started by the file manager (if any) to complete
+    wait_for_experiment_merge(logger)
+
     # Check if the main page has set up the proper session state variables and check that at
     # least one experiment has been loaded
     enable = True
@@ -917,7 +925,7 @@ try:
                                 new_container.add_experiment(status[id])
 
                         available_containers.append(new_container)
-                        st.experimental_rerun()
+                        st.rerun()
 
                     else:
                         st.error(f"ERROR: the name '{container_name}' is already taken.")
@@ -948,7 +956,7 @@ try:
                                 selected_container_name
                             )
                             del available_containers[idx]
-                            st.experimental_rerun()
+                            st.rerun()
 
                         st.markdown("---")
 
@@ -1008,7 +1016,7 @@ try:
 
                                 if apply_ref:
                                     selected_container.reference = [exp_index, cycle_index]
-                                    st.experimental_rerun()
+                                    st.rerun()
 
                                 # selected_container.
 
@@ -1040,7 +1048,7 @@ try:
                                     )
                                     id = status.get_index_of(experiment_name)
                                     selected_container.add_experiment(status[id])
-                                    st.experimental_rerun()
+                                    st.rerun()
 
                             else:
                                 logger.info(
@@ -1080,7 +1088,7 @@ try:
 
                                     for name in get_experiment_names:
                                         selected_container.remove_experiment(name)
-                                    st.experimental_rerun()
+                                    st.rerun()
 
                     else:
                         st.info(
@@ -1121,7 +1129,7 @@ try:
 
                 if plot_settings_dict != {}:
 
-                    plot_names: List[str] = [name for name in plot_settings_dict.keys()]
+                    plot_names: List[str] = list(plot_settings_dict)
 
                     st.markdown("###### Plot selector")
 
@@ -1139,7 +1147,7 @@ try:
                     if remove:
                         logger.info(f"REMOVED plot name: {selected_plot})")
                         del plot_settings_dict[selected_plot]
-                        st.experimental_rerun()
+                        st.rerun()
 
                     st.markdown("---")
 
@@ -1173,18 +1181,9 @@ except st.runtime.scriptrunner.script_runner.RerunException:
 
 except:
     logger.exception(
-        f"Unexpected exception occurred during cell-cycling plotter page execution:\n\n {traceback.print_exception(*sys.exc_info())}"
+        "Unexpected exception occurred during cell-cycling plotter page execution"
     )
-    dump_index = 0
-    while True:
-        dump_file = f"./GES_echem_gui_dump_{dump_index}.pickle"
-        if os.path.isfile(dump_file):
-            dump_index += 1
-        else:
-            logger.critical(f"Dumping the content of the session state to '{dump_file}'")
-            with open(dump_file, "wb") as file:
-                pickle.dump(dict(st.session_state), file, protocol=pickle.HIGHEST_PROTOCOL)
-            break
+    dump_session_state(logger)
     raise
 
 else:
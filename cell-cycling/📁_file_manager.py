@@ -1,13 +1,28 @@
 import streamlit as st
 import pandas as pd
-import os, sys, logging, traceback, pickle, secrets
+import copy, logging, secrets
+from collections import defaultdict
+from math import isclose
+from operator import attrgetter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple, Union
 
 from core.gui_core import ProgramStatus
 from core.exceptions import MultipleExtensions, UnknownExtension
 from core.colors import ColorRGB, RGB_to_HEX, HEX_to_RGB
 
 from core.experiment import Experiment
-from core.utils import set_production_page_style
+from core.utils import (
+    set_production_page_style,
+    dump_session_state,
+    wait_for_experiment_merge,
+)
+from core.session_state_manager import (
+    save_checkpoint,
+    load_checkpoint,
+    new_checkpoint_key,
+    remove_expired_checkpoints,
+)
 from core.post_process_handler import update_experiment_name, remove_experiment_entries
 
 # Set the wide layout style and remove menus and markings from display
@@ -18,42 +33,476 @@ set_production_page_style()
 if "Token" not in st.session_state:
     st.session_state["Token"] = secrets.token_hex(4)
 
-@st.cache
-def init_logger(dump_log: bool = True):
-    logger = logging.getLogger(__name__)
-    if dump_log:
-        handler = logging.FileHandler(f'{st.session_state["Token"]}.log', mode="w")
+# Create a logger for each session token, the logger is stored as a shared resource so that
+# the file handler is added only once and is not duplicated on every rerun of the page
+@st.cache_resource
+def init_logger(token: str, dump_log: bool = True):
+    logger = logging.getLogger(f"{__name__}.{token}")
+    if dump_log and not logger.handlers:
+        handler = logging.FileHandler(f"{token}.log", mode="w")
         formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s [line: %(lineno)d]")
         handler.setFormatter(formatter)
         logger.addHandler(handler)
     logger.setLevel(logging.DEBUG)
     return logger
 
-logger = init_logger()
+logger = init_logger(st.session_state["Token"])
+
+
+# Create the thread pool used to merge the experiments without blocking the script, the
+# pool is stored as a shared resource so that it is created only once
+@st.cache_resource
+def get_merge_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="experiment_merge")
+
+
+def merge_experiment(experiment: Experiment, new_experiment: Experiment) -> Experiment:
+    """
+    Merges the files of a new experiment into a copy of an existing one. The function is
+    run by the merge executor and leaves the existing experiment untouched so that the
+    pages can keep reading it until the merged copy is swapped in its place (see
+    wait_for_experiment_merge).
+
+    Arguments
+    ---------
+        experiment : Experiment
+            the experiment to which the files must be added
+        new_experiment : Experiment
+            the experiment holding the new files
+
+    Returns
+    -------
+        Experiment
+            the merged copy of the experiment
+    """
+    merged = copy.deepcopy(experiment)
+    merged += new_experiment
+    return merged
+
+
+def log_checkpoint_outcome(future: Future) -> None:
+    """
+    Logs the outcome of the checkpoint write operation run in background (see
+    save_checkpoint)
+    """
+    if future.exception() is not None:
+        logger.error(f"Failed to save the session checkpoint: {future.exception()!r}")
+    else:
+        logger.info("SAVED session checkpoint")
+
+
+# Generate the secret key identifying the checkpoint of the session. The key is known
+# only to the server and to the user (it is never placed in the page URL) and, when a
+# new session is created, the expired checkpoints of the previous sessions are removed
+if "CheckpointKey" not in st.session_state:
+    st.session_state["CheckpointKey"] = new_checkpoint_key()
+    remove_expired_checkpoints()
+
+
+def restore_checkpoint() -> None:
+    """
+    Callback loading the checkpoint identified by the key entered by the user. On
+    success the session adopts the key of the restored checkpoint and the experiment counter is
+    moved past the IDs of the restored experiments so that the new experiments have
+    univocal IDs.
+    """
+    key = st.session_state["RestoreKeyInput"]
+    st.session_state["RestoreKeyInput"] = ""
+
+    if not load_checkpoint(key):
+        logger.warning("Failed to restore the session checkpoint")
+        st.session_state["RestoreFailed"] = True
+        return
+
+    logger.info("LOADED session checkpoint")
+    st.session_state["CheckpointKey"] = key
+    st.session_state.pop("CheckpointFingerprint", None)
+    st.session_state["__EXPERIMENT_INIT_COUNTER__"] = max(
+        [experiment._id + 1 for experiment in st.session_state["ProgramStatus"]],
+        default=0,
+    )
 
 # Configure the session state for the first time with the data useful to completly describe
-# The current page
-if "ProgramStatus" not in st.session_state:
-    st.session_state["Version"] = "0.1.1"
-    st.session_state["Logger"] = logger
-    st.session_state["ProgramStatus"] = ProgramStatus()
-    st.session_state["UploadActionRadio"] = None
-    st.session_state["UploadConfirmation"] = [None, None]
-    st.session_state["SelectedExperimentName"] = None
-
-    if "__EXPERIMENT_INIT_COUNTER__" not in st.session_state:
-        st.session_state["__EXPERIMENT_INIT_COUNTER__"] = 0
+# The current page. The ProgramStatus holds the experiments of a single user and, as such,
+# is kept in the session state and not shared as a resource
+st.session_state.setdefault("Version", "0.1.1")
+st.session_state.setdefault("Logger", logger)
+st.session_state.setdefault("ProgramStatus", ProgramStatus())
+st.session_state.setdefault("UploadActionRadio", None)
+st.session_state.setdefault("UploadConfirmation", [None, None])
+st.session_state.setdefault("SelectedExperimentName", None)
+st.session_state.setdefault("__EXPERIMENT_INIT_COUNTER__", 0)
 
 # Create a short name for the ProgramStatus object in the session_state chache
 status: ProgramStatus = st.session_state["ProgramStatus"]
 
+
+# Define the callbacks used to apply the edits done to an experiment. The callbacks are run
+# before the rerun triggered by the widget so that no further rerun is required
+def parse_float(value: str) -> Union[float, None]:
+    """
+    Returns the float represented by a string or None if the string is not a valid float
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def apply_name_change(experiment: Experiment, key: str) -> None:
+    """
+    Callback renaming an experiment according to the value of the text input widget
+    associated to a given key
+    """
+    name, new_name = experiment.name, st.session_state[key]
+    if new_name != name:
+        logger.info(f"CHANGED experiment name from {name} to {new_name}")
+        status.rename_experiment(name, new_name)
+        st.session_state["SelectedExperimentName"] = new_name
+        update_experiment_name(name, new_name)
+
+
+def apply_float_change(experiment: Experiment, attribute: str, key: str) -> None:
+    """
+    Callback setting the volume or the area of an experiment according to the value of
+    the text input widget associated to a given key. Invalid values, and values matching
+    the current one up to the floating point round-off, are ignored.
+    """
+    raw_value = st.session_state[key]
+    if raw_value == "":
+        return
+
+    value = parse_float(raw_value)
+    if value is None:
+        logger.error(f"Invalid value for {attribute} '{raw_value}'")
+        return
+
+    current = getattr(experiment, attribute)
+    if current is None or not isclose(value, current, rel_tol=1e-12):
+        logger.info(f"SET {attribute} to {value}")
+        setattr(experiment, attribute, value)
+
+
+def apply_clean_change(experiment: Experiment, key: str) -> None:
+    """
+    Callback setting the clean option of an experiment according to the value of the
+    checkbox widget associated to a given key
+    """
+    if st.session_state[key] != experiment.clean:
+        logger.info(f"SET clean option to {st.session_state[key]}")
+        experiment.clean = st.session_state[key]
+
+
+def apply_color_change(experiment: Experiment, key: str) -> None:
+    """
+    Callback setting the base color of an experiment according to the value of the color
+    picker widget associated to a given key
+    """
+    color = st.session_state[key]
+    if color.upper() != RGB_to_HEX(*experiment.color.get_RGB()).upper():
+        logger.info(f"SET base color to {color}")
+        experiment.color = ColorRGB(*HEX_to_RGB(color))
+
+
+def validate_ordering(
+    ordering_buffer: Dict[str, Tuple[int, int]], halfcycle_types: Dict[str, str]
+) -> Tuple[List[str], bool, bool, Union[List[List[str]], None]]:
+    """
+    Validates the halfcycle ordering selected by the user and builds the corresponding
+    file ordering.
+
+    Arguments
+    ---------
+        ordering_buffer : Dict[str, Tuple[int, int]]
+            dictionary associating to each filename the selected Halfcycle ID and the
+            order of the partial file in the halfcycle
+        halfcycle_types : Dict[str, str]
+            dictionary associating to each filename the type of the halfcycle
+
+    Returns
+    -------
+        List[str]
+            the list of the missing Halfcycle IDs
+        bool
+            True if two files share the same position
+        bool
+            True if charge and discharge files are joined in the same halfcycle
+        Union[List[List[str]], None]
+            the new file ordering if the selection is valid, None otherwise
+    """
+    # Compute the maximum cycle index selected
+    max_cycle = max(cycle for cycle, _ in ordering_buffer.values())
+
+    # Process the ordering_buffer dictionary to a subset of halfcycle ordering
+    # dictionary (a repetition is present if two files share the same position)
+    cycle_based_buffer = defaultdict(dict)
+    repetition = False
+    for filename, (cycle, halfcycle) in ordering_buffer.items():
+        if halfcycle in cycle_based_buffer[cycle]:
+            repetition = True
+        cycle_based_buffer[cycle][halfcycle] = filename
+
+    # Check which Halfcycle IDs are missing in the cycle_based_buffer to identify holes
+    # in the cycle sequence
+    missing = [
+        str(index) for index in range(max_cycle + 1) if index not in cycle_based_buffer
+    ]
+
+    # Check if all the the partial halfcycle files in a group are of the same type
+    mismatch = any(
+        len({halfcycle_types[name] for name in buffer.values()}) > 1
+        for buffer in cycle_based_buffer.values()
+    )
+
+    if missing != [] or repetition or mismatch:
+        return missing, repetition, mismatch, None
+
+    # Define the new ordering appending the halfcycles in order of index
+    new_ordering = [
+        [cycle_based_buffer[cycle][i] for i in sorted(cycle_based_buffer[cycle])]
+        for cycle in range(max_cycle + 1)
+    ]
+    return missing, repetition, mismatch, new_ordering
+
+
+# Column configuration used to print the timestamps in the inspector reports, the
+# timestamps are sent as datetime values and formatted by the frontend
+TIMESTAMP_COLUMN = st.column_config.DatetimeColumn(format="DD/MM/YYYY    HH:mm:ss")
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_ordering_table(revision: str, _experiment: Experiment) -> pd.DataFrame:
+    """
+    Builds the table reporting the final composition of each halfcycle of an experiment.
+    The table is cached based on the revision of the experiment so that it is built only
+    once for each file ordering.
+
+    Arguments
+    ---------
+        revision : str
+            the revision of the experiment (see Experiment.revision)
+        _experiment : Experiment
+            the experiment object (not hashed)
+
+    Returns
+    -------
+        pd.DataFrame
+            the table listing the halfcycle, partial halfcycle, type, timestamp and
+            filename of each parsed file
+    """
+    halfcycles = _experiment.manager.halfcycles
+
+    table = []
+    for level, level_list in enumerate(_experiment.ordering):
+        for number, filename in enumerate(level_list):
+            halfcycle = halfcycles[filename]
+            table.append(
+                [level, number, halfcycle.halfcycle_type, halfcycle.timestamp, filename]
+            )
+
+    df = pd.DataFrame(
+        table,
+        columns=["Halfcycle", "Partial halfcycle", "Type", "Timestamp", "Filename"],
+    )
+
+    # Convert the timestamps to a datetime column (formatted by the frontend)
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+
+    # Use Arrow backed strings and a categorical type column to reduce the size of the
+    # table sent to the frontend
+    return df.astype({"Type": "category", "Filename": "string[pyarrow]"})
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_cycles_table(revision: str, _experiment: Experiment) -> pd.DataFrame:
+    """
+    Builds the table reporting the composition of each cycle of an experiment. The table
+    is cached based on the revision of the experiment so that it is built only once for
+    each set of cycles.
+
+    Arguments
+    ---------
+        revision : str
+            the revision of the experiment (see Experiment.revision)
+        _experiment : Experiment
+            the experiment object (not hashed)
+
+    Returns
+    -------
+        pd.DataFrame
+            the table listing the charge timestamp, discharge timestamp and hidden status
+            of each cycle
+    """
+    # Read the charge, the discharge and the hidden status of all the cycles at once
+    cycles = _experiment._cycles
+    get_attributes = attrgetter("_charge", "_discharge", "_hidden")
+    charges, discharges, hidden = (
+        zip(*map(get_attributes, cycles)) if cycles else ((), (), ())
+    )
+
+    # Collect the timestamps of all the cycles in datetime columns (formatted by the
+    # frontend), the missing halfcycles are stored as NaT and reported as "None"
+    charge_timestamps = pd.to_datetime(
+        [charge._timestamp if charge != None else None for charge in charges]
+    )
+    discharge_timestamps = pd.to_datetime(
+        [
+            discharge._timestamp if discharge != None else None
+            for discharge in discharges
+        ]
+    )
+
+    return pd.DataFrame(
+        {
+            "Charge timestamp": charge_timestamps,
+            "Discharge timestamp": discharge_timestamps,
+            "Hidden": pd.Series(hidden, dtype=bool),
+        }
+    )
+
+
+@st.fragment
+def render_inspector() -> None:
+    """
+    Renders the experiment inspector tab. The tab is rendered as a fragment so that the
+    selection of a different experiment reruns only the inspector and not the whole
+    page.
+    """
+    logger.info("Rendering the experiment inspector tab")
+
+    # Print a title and some info about the usage of the current tab
+    st.markdown("### Experiment inspector:")
+    st.write("""In this tab you can inspect the experiments created,  """)
+
+    # If no experiment has been loaded skip all the report work
+    if status.number_of_experiments == 0:
+        st.info("Load the experiment files to see the report")
+        return
+
+    # Display a selectbox listing all the experiments available
+    experiment_names = status.get_experiment_names()
+    default_index = 0
+    if st.session_state["SelectedExperimentName"] is not None:
+        default_index = status.get_index_of(st.session_state["SelectedExperimentName"])
+
+    name = st.selectbox(
+        "Select the experiment to inspect", experiment_names, index=default_index
+    )
+    logger.debug(f"-> selected experiment name: {name}")
+
+    if name != None:
+
+        # Load the selected experiment in a fresh variable
+        experiment: Experiment = status.get_experiment_map()[name]
+
+        # Get, once, the names of the uploaded files (if all the files have been removed
+        # there is nothing to report)
+        file_names = experiment.file_names
+        if file_names == ():
+            st.info("Load the experiment files to see the report")
+            return
+
+        st.markdown("### General data:")
+        st.markdown("Instrument: ***{}***".format(experiment.manager.instrument))
+
+        # Get the number of parsed halfcycles, of halfcycles in the ordering and of hidden
+        # cycles from the current experiment
+        n_halfcycles = len(experiment.manager.halfcycles)
+        n_ordered = len(experiment.ordering)
+        n_hidden = experiment.n_hidden_cycles
+
+        # Print report on the number of loaded/parsed/skipped files, and on the joined/hidden cycles
+        c1, c2, c3, c4, c5 = st.columns(5)
+        with c1:
+            st.metric("Uploaded files", value=len(file_names))
+
+        with c2:
+            st.metric("Parsed halfcycles", value=n_halfcycles)
+
+        with c3:
+            st.metric("Skipped files", value=experiment._skipped_files)
+
+        with c4:
+            st.metric("Halfcycles joined", value=n_halfcycles - n_ordered)
+
+        with c5:
+            st.metric("Hidden cycles", value=n_hidden)
+
+        # Generate a report on the loaded vs parsed/skipped files
+        with st.expander("Loaded file report:", expanded=True):
+
+            # Show the status of each file in a single table
+            parsed_files = set(experiment.get_parsed_files())
+            st.dataframe(
+                pd.DataFrame(
+                    {
+                        "ID": range(len(file_names)),
+                        "Filename": file_names,
+                        "Status": [
+                            "🟢 PARSED" if filename in parsed_files else "🔴 SKIPPED"
+                            for filename in file_names
+                        ],
+                    }
+                ),
+                hide_index=True,
+                use_container_width=True,
+            )
+
+        # Get the non editable table with the final composition of each halfcycle
+        df = build_ordering_table(experiment.revision, experiment)
+
+        # Print the halfcycle table in a dedicated expander
+        with st.expander("Halfcycles file ordering report:", expanded=True):
+            st.markdown("**Ordering report:**")
+            st.dataframe(
+                df,
+                hide_index=True,
+                use_container_width=True,
+                column_config={"Timestamp": TIMESTAMP_COLUMN},
+            )
+
+        # Get the non-editable table reporting the composition of each cycle
+        df = build_cycles_table(experiment.revision, experiment)
+
+        # Print the cycle table in a dedicated expander
+        with st.expander("Cycles report after parsing:", expanded=True):
+            st.markdown("**Cycles report:**")
+            st.dataframe(
+                df,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "Charge timestamp": TIMESTAMP_COLUMN,
+                    "Discharge timestamp": TIMESTAMP_COLUMN,
+                },
+            )
+
+
 try:
 
     logger.info("RUNNING File manager page rendering")
 
+    # Wait for the experiment merge submitted during the previous run (if any) before
+    # accessing the experiments
+    wait_for_experiment_merge(logger)
+
     with st.sidebar:
         st.info(f'Session token: {st.session_state["Token"]}')
 
+        # Show the key of the session checkpoint and let the user restore a previous
+        # session (e.g. after the page has been reloaded) by entering its key
+        with st.expander("Session restore"):
+            st.caption("Keep this key private: it gives access to the session data.")
+            st.code(st.session_state["CheckpointKey"], language=None)
+            st.text_input(
+                "Restore key of a previous session",
+                type="password",
+                key="RestoreKeyInput",
+                on_change=restore_checkpoint,
+            )
+            if st.session_state.pop("RestoreFailed", False):
+                st.error("ERROR: No valid checkpoint found for the given key")
+
     st.title("Experiment file manager")  # Print a title for the page
 
     upload_tab, manipulation_tab, inspector_tab = st.tabs(["Upload", "Edit", "Inspect"])
@@ -137,59 +586,52 @@ try:
                         else:
                             name = new_experiment.name
 
+                        # Generate a list of skipped files
+                        if new_experiment.manager.instrument not in ["GAMRY", "BIOLOGIC"]:
+                            raise RuntimeError
+
+                        parsed_files = set(new_experiment.get_parsed_files())
+                        skipped_files = [
+                            filename
+                            for filename in new_experiment.file_names
+                            if filename not in parsed_files
+                        ]
+
                         # If the selected action is "Create new experiment" add the new experiment to the ProgramStatus
                         if action == "Create new experiment":
+                            new_experiment._skipped_files += len(skipped_files)
                             status.append_experiment(new_experiment)
                             logger.info(f"CREATED experiment {name}")
 
                         # If the selected action is "Add new experiment", add the object to the already available one
                         else:
-                            experiment = status[status.get_index_of(name)]
+                            experiment = status.get_experiment_map()[name]
 
                             if experiment.manager.instrument != new_experiment.manager.instrument:
                                 st.error("ERROR: Cannot join file from different instruments in a single experiment")
                                 logger.error(f"ERROR: Cannot join file from different instruments in a single experiment {name}")
                             else:
-                                experiment += new_experiment
-                                logger.info(f"UPDATED experiment {name}")
+                                # Merge the files in background into a copy of the
+                                # experiment that replaces the original one once the
+                                # merge is completed (see wait_for_experiment_merge)
+                                future = get_merge_executor().submit(
+                                    merge_experiment, experiment, new_experiment
+                                )
+                                st.session_state["merge_future"] = (
+                                    experiment,
+                                    len(skipped_files),
+                                    future,
+                                )
+                                logger.info(f"SUBMITTED update of experiment {name}")
 
                         # Add the informations about the loaded experiment to a rerun-safe self-cleaning variable
                         st.session_state["UploadConfirmation"][0] = new_experiment.name
 
-                        # Generate a list of skipped files
-                        skipped_files = []
-                        if new_experiment.manager.instrument == "GAMRY":
-                            if len(new_experiment.manager.bytestreams) != len(
-                                new_experiment.manager.halfcycles
-                            ):
-                                for filename in new_experiment.manager.bytestreams.keys():
-                                    if filename not in new_experiment.manager.halfcycles.keys():
-                                        skipped_files.append(filename)
-                                st.session_state["UploadConfirmation"][1] = skipped_files
-
-                        elif new_experiment.manager.instrument == "BIOLOGIC":
-                            for filename in new_experiment.manager.bytestreams.keys():
-                                find = False
-                                for search in new_experiment.manager.halfcycles.keys():
-                                    if filename in search:
-                                        find = True
-                                        break
-
-                                if find is False:
-                                    skipped_files.append(filename)
-                            if skipped_files != []:
-                                st.session_state["UploadConfirmation"][1] = skipped_files
-
-                        else:
-                            raise RuntimeError
-
                         if skipped_files != []:
-                            status[status.get_index_of(name)]._skipped_files += len(
-                                skipped_files
-                            )
+                            st.session_state["UploadConfirmation"][1] = skipped_files
 
                         # Rerun the page to force update
-                        st.experimental_rerun()
+                        st.rerun()
 
         created_experiment = st.session_state["UploadConfirmation"][0]
         skipped_files = st.session_state["UploadConfirmation"][1]
@@ -237,8 +679,9 @@ try:
 
             st.session_state["SelectedExperimentName"] = name
 
-            # Load the selected experiment in a fresh variable
-            experiment: Experiment = status[status.get_index_of(name)]
+            # Load the selected experiment, and its index, in fresh variables
+            exp_index = status.get_index_of(name)
+            experiment: Experiment = status[exp_index]
 
             st.markdown("""---""")
 
@@ -248,7 +691,7 @@ try:
                 # Define the first section with the main experiment attributes
                 st.markdown("### Experiment attributes:")
                 st.markdown(f"Experiment name: `{name}`")
-                st.markdown(f"Internal ID: `{status.get_index_of(name)}`")
+                st.markdown(f"Internal ID: `{exp_index}`")
 
             with col2:
                 # Define a danger zone with red text to delete an experiment from memory
@@ -266,10 +709,10 @@ try:
                 if delete:
                     logger.info(f"DELETED experiment {experiment.name}")
                     remove_experiment_entries(experiment.name)
-                    status.remove_experiment(status.get_index_of(experiment.name))
+                    status.remove_experiment(exp_index)
                     if st.session_state["SelectedExperimentName"] == experiment.name:
                         st.session_state["SelectedExperimentName"] = None
-                    st.experimental_rerun()
+                    st.rerun()
 
             st.markdown("""---""")
 
@@ -279,16 +722,13 @@ try:
 
                 # Allow the user to re-define the experiment name
                 st.markdown("##### Experiment name:")
-                new_experiment_name = st.text_input("Experiment name", name)
-
-                if new_experiment_name != name:
-                    logger.info(
-                        f"CHANGED experiment name from {name} to {new_experiment_name}"
-                    )
-                    experiment.name = new_experiment_name
-                    st.session_state["SelectedExperimentName"] = new_experiment_name
-                    update_experiment_name(name, new_experiment_name)
-                    st.experimental_rerun()
+                st.text_input(
+                    "Experiment name",
+                    name,
+                    key=f"Edit_name_{experiment._id}",
+                    on_change=apply_name_change,
+                    args=[experiment, f"Edit_name_{experiment._id}"],
+                )
 
                 # Allow the user to define the experiment volume
                 st.markdown("##### Electrolite volume:")
@@ -297,21 +737,15 @@ try:
                     value="" if experiment.volume is None else str(experiment.volume),
                     help="""If set for all the experiments, it unlocks the options 
                     of examining the data in terms of the volumetric capacity""",
+                    key=f"Edit_volume_{experiment._id}",
+                    on_change=apply_float_change,
+                    args=[experiment, "volume", f"Edit_volume_{experiment._id}"],
                 )
 
-                if volume_str != "":
-                    try:
-                        volume = float(volume_str)
-                    except Exception:
-                        st.error(
-                            f"ERROR: the input '{volume_str}' does not represent a valid floating point value"
-                        )
-                        logger.error(f"Invalid value for volume '{volume_str}'")
-                    else:
-                        if volume != experiment.volume:
-                            logger.info(f"SET volume to {volume}L")
-                            experiment.volume = volume
-                            st.experimental_rerun()
+                if volume_str != "" and parse_float(volume_str) is None:
+                    st.error(
+                        f"ERROR: the input '{volume_str}' does not represent a valid floating point value"
+                    )
 
                 # Allow the user to define the experiment electrode area
                 st.markdown("##### Electrode area:")
@@ -320,46 +754,37 @@ try:
                     value="" if experiment.area is None else str(experiment.area),
                     help="""If set for all the experiments, it unlocks the options 
                     of examining the data in terms of the current density""",
+                    key=f"Edit_area_{experiment._id}",
+                    on_change=apply_float_change,
+                    args=[experiment, "area", f"Edit_area_{experiment._id}"],
                 )
 
-                if area_str != "":
-                    try:
-                        area = float(area_str)
-                    except Exception:
-                        st.error(
-                            f"ERROR: the input '{area_str}' does not represent a valid floating point value"
-                        )
-                        logger.error(f"Invalid value for electrode area '{area_str}'")
-                    else:
-                        if area != experiment.area:
-                            logger.info(f"SET electrode area to {area}cm^2")
-                            experiment.area = area
-                            st.experimental_rerun()
+                if area_str != "" and parse_float(area_str) is None:
+                    st.error(
+                        f"ERROR: the input '{area_str}' does not represent a valid floating point value"
+                    )
 
             with col2:
 
                 # Allow the user to select if the self-cleaning option must be used
                 st.markdown("##### Clean non-physical cycles")
-                clean_status = st.checkbox(
+                st.checkbox(
                     " Allow only efficiencies <100% and complete charge/discharge cycles",
                     value=experiment.clean,
+                    key=f"Edit_clean_{experiment._id}",
+                    on_change=apply_clean_change,
+                    args=[experiment, f"Edit_clean_{experiment._id}"],
                 )
-                if clean_status != experiment.clean:
-                    st.info(f"SET clean option to {clean_status}")
-                    experiment.clean = clean_status
-                    st.experimental_rerun()
 
                 # Allow the user to select a base color for the experiment to be used in the stacked-plot
                 st.markdown("##### Base color:")
-                current_color = RGB_to_HEX(*experiment.color.get_RGB())
-                color = st.color_picker(
+                st.color_picker(
                     "Select the color to be used as basecolor",
-                    value=current_color,
+                    value=RGB_to_HEX(*experiment.color.get_RGB()),
+                    key=f"Edit_color_{experiment._id}",
+                    on_change=apply_color_change,
+                    args=[experiment, f"Edit_color_{experiment._id}"],
                 )
-                if color != current_color:
-                    st.info(f"SET base color to {color}")
-                    experiment.color = ColorRGB(*HEX_to_RGB(color))
-                    st.experimental_rerun()
 
             st.markdown("""   """)
 
@@ -373,36 +798,28 @@ try:
                 with cright:
                     remove = st.button("🗑️ Remove selected", key="upper")
 
-                # Print a header for the table
-                cid, cname, cselection = st.columns(3)
-                with cid:
-                    st.markdown("#### ID")
-                with cname:
-                    st.markdown("#### Filename")
-                with cselection:
-                    st.markdown("#### Selection")
-
-                # Define an empty list to contain the file selected in the selection column
-                selection_list = []
-
-                # Cycle over all the bytestream entry and print the wanted data
-                for idx, filename in enumerate(experiment._manager.bytestreams.keys()):
-
-                    with st.container():
-                        cid, cname, cselection = st.columns(3)
-                        with cid:
-                            st.write(idx)
-                        with cname:
-                            st.write(filename)
-                        with cselection:
-                            checked = st.checkbox("", key=filename)
-
-                        # Update the selection list based on the check_box status
-                        if checked:
-                            selection_list.append(filename)
-                        else:
-                            if filename in selection_list:
-                                del selection_list[filename]
+                # Show a table listing all the loaded files in which the user can select the
+                # files to be removed. The widget key is bound to the experiment revision so
+                # that the selection is cleared once the files are removed
+                file_names = experiment.file_names
+                edited_files = st.data_editor(
+                    pd.DataFrame(
+                        {
+                            "ID": range(len(file_names)),
+                            "Filename": file_names,
+                            "Selection": [False] * len(file_names),
+                        }
+                    ),
+                    hide_index=True,
+                    disabled=["ID", "Filename"],
+                    use_container_width=True,
+                    key=f"files_editor_{experiment.revision}",
+                )
+
+                # Define the list of files selected in the selection column
+                selection_list = edited_files.loc[
+                    edited_files["Selection"], "Filename"
+                ].tolist()
 
                 logger.debug(f"-> File selection list: [{selection_list}]")
                 # Print a button on the right to remove the selected files
@@ -415,7 +832,7 @@ try:
                     logger.info(f"DELETED files [{selection_list}]")
                     for filename in selection_list:
                         experiment.remove_file(filename)
-                    st.experimental_rerun()
+                    st.rerun()
 
             # If the .DTA files from GAMRY are loaded create a section dedicated to the process of merging/ordering of halfcycles
             if experiment.manager.instrument == "GAMRY":
@@ -426,137 +843,104 @@ try:
                 current_ordering = experiment.ordering
                 logger.debug(f"-> Current ordering: [{current_ordering}]")
 
-                # Generate a table with number_input widgets to allow the user to select the proper file ordering
+                # Get the table listing the timestamp, the type and the runtime of each halfcycle
+                files_frame = experiment.files_frame
+
+                # Generate an editable table to allow the user to select the proper file ordering
                 with st.expander("Halfcycle ordering manipulation"):
 
-                    # Generate a header section
-                    with st.container():
-                        cname, ctstamp, ctype, ctime, ccycle, chalfcycle = st.columns(6)
-                        with cname:
-                            st.markdown("#### Filename")
-                        with ctstamp:
-                            st.markdown("#### Timestamp")
-                        with ctype:
-                            st.markdown("#### Type")
-                        with ctime:
-                            st.markdown("#### Runtime (s)")
-                        with ccycle:
-                            st.markdown("#### Halfcycle ID")
-                        with chalfcycle:
-                            st.markdown("#### Ordering")
-
-                    # Generate the table body
-                    max_cycle = 0  # Maximum cycle index selected
-                    ordering_buffer = (
-                        {}
-                    )  # Buffer dictionary to store the Halfcycle ID and HalfCycle IDs associated to a given filename
-
-                    # Iterate over all the entry of the suggested ordering list
-                    for cycle, cycle_list in enumerate(current_ordering):
-                        for halfcycle, filename in enumerate(cycle_list):
-
-                            ordering_buffer[filename] = (
-                                cycle,
-                                halfcycle,
-                            )  # Fill the ordering buffer with the current_ordering
-
-                            with st.container():
-                                (
-                                    cname,
-                                    ctstamp,
-                                    ctype,
-                                    ctime,
-                                    ccycle,
-                                    chalfcycle,
-                                ) = st.columns(6)
-                                with cname:
-                                    st.write(filename)
-                                with ctstamp:
-                                    st.write(
-                                        experiment.manager.halfcycles[filename].timestamp
-                                    )
-                                with ctype:
-                                    st.write(
-                                        experiment.manager.halfcycles[
-                                            filename
-                                        ].halfcycle_type
-                                    )
-                                with ctime:
-                                    st.write(
-                                        experiment.manager.halfcycles[filename].time.iloc[
-                                            -1
-                                        ]
-                                    )
-                                with ccycle:
-                                    # Save a temporary variable with the selected cycle
-                                    new_cycle = int(
-                                        st.number_input(
-                                            "Halfcycle ID:",
-                                            min_value=0,
-                                            value=cycle,
-                                            step=1,
-                                            key=f"Cycle_{filename}",
-                                        )
-                                    )
-                                    max_cycle = max(
-                                        max_cycle, new_cycle
-                                    )  # Update the max_cycle variable
-                                with chalfcycle:
-                                    # Save a temporary variable with the selected halfcycle
-                                    new_halfcycle = int(
-                                        st.number_input(
-                                            "partial files order:",
-                                            min_value=0,
-                                            value=halfcycle,
-                                            step=1,
-                                            key=f"Halfcycle_{filename}",
-                                        )
-                                    )
-
-                                # If something has been changed by the user override the dictionary entry
-                                if cycle != new_cycle or halfcycle != new_halfcycle:
-                                    logger.debug(
-                                        f" -> CHANGED ordering for file '{filename}'"
-                                    )
-                                    logger.debug(
-                                        f"    -> Halfcyle from {cycle} to {new_cycle}"
-                                    )
-                                    logger.debug(
-                                        f"    -> Ordering from {halfcycle} to {new_halfcycle}"
-                                    )
-                                    ordering_buffer[filename] = (new_cycle, new_halfcycle)
-
-                    # Process the ordering_buffer dictionary to a subset of halfcycle ordering dictionary
-                    repetition = False
-                    cycle_based_buffer = [{} for _ in range(max_cycle + 1)]
-                    for filename, entry in ordering_buffer.items():
-                        cycle, halfcycle = entry[0], entry[1]
-                        if halfcycle in cycle_based_buffer[cycle].keys():
-                            repetition = True
-                        cycle_based_buffer[cycle][halfcycle] = filename
-
-                    # Check if there are empty dictionary in the cycle_based_buffer to identify holes in the cycle sequence
-                    missing = []
-                    for index, dictionary in enumerate(cycle_based_buffer):
-                        if dictionary == {}:
-                            missing.append(str(index))
-
-                    # Check if all the the partial halfcycle files in a group are of the same charge/discharge type
-                    partial_halfcycle_type_mismatch = False
-                    for buffer in cycle_based_buffer:
-                        is_charge_list = []
-                        for filename in buffer.values():
-                            is_charge = (
-                                True
-                                if experiment.manager.halfcycles[filename].halfcycle_type
-                                == "charge"
-                                else False
-                            )
-                            is_charge_list.append(is_charge)
-
-                        if any([value != is_charge_list[0] for value in is_charge_list]):
-                            partial_halfcycle_type_mismatch = True
-                            break
+                    # List the Halfcycle ID and the partial file order of each file according
+                    # to the current ordering
+                    positions = [
+                        (filename, cycle, halfcycle)
+                        for cycle, cycle_list in enumerate(current_ordering)
+                        for halfcycle, filename in enumerate(cycle_list)
+                    ]
+
+                    # Build the table of the files in the current ordering
+                    ordering_table = files_frame.loc[
+                        [filename for filename, _, _ in positions]
+                    ].reset_index()
+                    ordering_table["cycle"] = [cycle for _, cycle, _ in positions]
+                    ordering_table["halfcycle"] = [
+                        halfcycle for _, _, halfcycle in positions
+                    ]
+
+                    # Show the table in a data editor in which only the Halfcycle ID and the
+                    # Ordering columns can be edited. The widget key is bound to the experiment
+                    # revision so that the edits are cleared once the new ordering is applied
+                    edited_table = st.data_editor(
+                        ordering_table,
+                        hide_index=True,
+                        disabled=["filename", "timestamp", "type", "runtime"],
+                        column_config={
+                            "filename": "Filename",
+                            "timestamp": "Timestamp",
+                            "type": "Type",
+                            "runtime": st.column_config.NumberColumn("Runtime (s)"),
+                            "cycle": st.column_config.NumberColumn(
+                                "Halfcycle ID", min_value=0, step=1, required=True
+                            ),
+                            "halfcycle": st.column_config.NumberColumn(
+                                "Ordering", min_value=0, step=1, required=True
+                            ),
+                        },
+                        use_container_width=True,
+                        key=f"ordering_editor_{experiment.revision}",
+                    )
+
+                    # Fill the buffer dictionary storing the Halfcycle ID and HalfCycle IDs
+                    # associated to a given filename with the values in the edited table
+                    ordering_buffer = {
+                        filename: (int(cycle), int(halfcycle))
+                        for filename, cycle, halfcycle in zip(
+                            edited_table["filename"],
+                            edited_table["cycle"],
+                            edited_table["halfcycle"],
+                        )
+                    }
+
+                    # Validate the ordering only if the table content has changed since
+                    # the last rerun, otherwise read the results stored in the session
+                    # state
+                    validation_key = (
+                        experiment.revision,
+                        tuple(sorted(ordering_buffer.items())),
+                    )
+                    cached = st.session_state.get("OrderingValidation")
+                    if cached is not None and cached[0] == validation_key:
+                        validation = cached[1]
+
+                    else:
+                        # Log the entries changed by the user
+                        for filename, cycle, halfcycle in positions:
+                            new_cycle, new_halfcycle = ordering_buffer[filename]
+                            if cycle != new_cycle or halfcycle != new_halfcycle:
+                                logger.debug(
+                                    f" -> CHANGED ordering for file '{filename}'"
+                                )
+                                logger.debug(
+                                    f"    -> Halfcyle from {cycle} to {new_cycle}"
+                                )
+                                logger.debug(
+                                    f"    -> Ordering from {halfcycle} to "
+                                    f"{new_halfcycle}"
+                                )
+
+                        validation = validate_ordering(
+                            ordering_buffer, files_frame["type"].to_dict()
+                        )
+                        st.session_state["OrderingValidation"] = (
+                            validation_key,
+                            validation,
+                        )
+
+                    (
+                        missing,
+                        repetition,
+                        partial_halfcycle_type_mismatch,
+                        new_ordering,
+                    ) = validation
 
                     # If there are missing levels print a warning to the user
                     if missing != []:
@@ -578,160 +962,14 @@ try:
                         )
                         logger.warning("Mismatch found in halfcycle files types")
 
-                    # Define the new ordering appending the halfcycles in order of index
-                    else:
-                        new_ordering = [[] for _ in range(max_cycle + 1)]
-                        for cycle, buffer in enumerate(cycle_based_buffer):
-                            for i in range(max(buffer.keys()) + 1):
-                                if i in buffer.keys():
-                                    new_ordering[cycle].append(buffer[i])
-
-                        if new_ordering != experiment.ordering:
-                            logger.info(f"SET new file ordering: {new_ordering}")
-                            experiment.ordering = new_ordering
-                            st.experimental_rerun()
+                    # Apply the new ordering if it differs from the current one
+                    elif new_ordering != experiment.ordering:
+                        logger.info(f"SET new file ordering: {new_ordering}")
+                        experiment.ordering = new_ordering
+                        st.rerun()
 
     with inspector_tab:
-        logger.info("Rendering the experiment inspector tab")
-
-        # Print a title and some info about the usage of the current tab
-        st.markdown("### Experiment inspector:")
-        st.write("""In this tab you can inspect the experiments created,  """)
-
-        # Display a selectbox listing all the experiments available
-        experiment_names = status.get_experiment_names()
-        default_index = 0
-        if st.session_state["SelectedExperimentName"] is not None:
-            default_index = status.get_index_of(st.session_state["SelectedExperimentName"])
-
-        name = st.selectbox(
-            "Select the experiment to inspect", experiment_names, index=default_index
-        )
-        logger.debug(f"-> selected experiment name: {name}")
-
-        if name != None:
-
-            # Load the selected experiment in a fresh variable
-            experiment: Experiment = status[status.get_index_of(name)]
-
-            st.markdown("### General data:")
-            st.markdown("Instrument: ***{}***".format(experiment.manager.instrument))
-
-            # Get the cycle list from the current experiment and compute the number of hidden cycles
-            cycles = experiment._cycles
-            n_hidden = 0
-            for cycle in cycles:
-                if cycle._hidden:
-                    n_hidden += 1
-
-            # Print report on the number of loaded/parsed/skipped files, and on the joined/hidden cycles
-            c1, c2, c3, c4, c5 = st.columns(5)
-            with c1:
-                st.metric("Uploaded files", value=len(experiment.manager.bytestreams))
-
-            with c2:
-                st.metric("Parsed halfcycles", value=len(experiment.manager.halfcycles))
-
-            with c3:
-                st.metric("Skipped files", value=experiment._skipped_files)
-
-            with c4:
-                st.metric(
-                    "Halfcycles joined",
-                    value=len(experiment.manager.halfcycles) - len(experiment.ordering),
-                )
-
-            with c5:
-                st.metric("Hidden cycles", value=n_hidden)
-
-            # Generate a report on the loaded vs parsed/skipped files
-            with st.expander("Loaded file report:", expanded=True):
-
-                col1, col2, col3 = st.columns(3)
-
-                with st.container():
-                    with col1:
-                        st.write("ID")
-                    with col2:
-                        st.write("Filename")
-                    with col3:
-                        st.write("Status:")
-
-                for idx, filename in enumerate(experiment.manager.bytestreams.keys()):
-
-                    with st.container():
-                        with col1:
-                            st.write(idx)
-                        with col2:
-                            st.write(filename)
-                        with col3:
-
-                            if (
-                                experiment.manager.instrument == "GAMRY"
-                                and filename in experiment.manager.halfcycles.keys()
-                            ):
-                                st.write("🟢 PARSED")
-
-                            elif experiment.manager.instrument == "BIOLOGIC" and any(
-                                [
-                                    filename in key
-                                    for key in experiment.manager.halfcycles.keys()
-                                ]
-                            ):
-                                st.write("🟢 PARSED")
-
-                            else:
-                                st.write("🔴 SKIPPED")
-
-            # Generate a non editable table with the final composition of each halfcycle
-            table = []
-            for level, level_list in enumerate(experiment.ordering):
-                for number, filename in enumerate(level_list):
-                    table.append(
-                        [
-                            level,
-                            number,
-                            experiment.manager.halfcycles[filename].halfcycle_type,
-                            experiment.manager.halfcycles[filename].timestamp.strftime(
-                                "%d/%m/%Y    %H:%M:%S"
-                            ),
-                            filename,
-                        ]
-                    )
-
-            df = pd.DataFrame(
-                table,
-                columns=["Halfcycle", "Partial halfcycle", "Type", "Timestamp", "Filename"],
-            )
-
-            # Print the halfcycle table in a dedicated expander
-            with st.expander("Halfcycles file ordering report:", expanded=True):
-                st.markdown("**Ordering report:**")
-                st.table(df)
-
-            # Generate a non-editable table reporting the composition of each cycle
-            table = []
-            for cycle in cycles:
-                charge_timestamp = (
-                    cycle._charge._timestamp.strftime("%d/%m/%Y    %H:%M:%S")
-                    if cycle._charge != None
-                    else "None"
-                )
-                discharge_timestamp = (
-                    cycle._discharge._timestamp.strftime("%d/%m/%Y    %H:%M:%S")
-                    if cycle._discharge != None
-                    else "None"
-                )
-                table.append([charge_timestamp, discharge_timestamp, cycle._hidden])
-
-            df = pd.DataFrame(
-                table, columns=["Charge timestamp", "Discharge timestamp", "Hidden"]
-            )
-
-            # Print the cycle table in a dedicated expander
-            with st.expander("Cycles report after parsing:", expanded=True):
-                st.markdown("**Cycles report:**")
-                st.table(df)
+        render_inspector()
 
 except st.runtime.scriptrunner.script_runner.RerunException:
     logger.info("EXPERIMENTAL RERUN CALLED")
@@ -739,19 +977,46 @@ except st.runtime.scriptrunner.script_runner.RerunException:
 
 except:
     logger.exception(
-        f"Unexpected exception occurred during file manager page execution:\n\n {traceback.print_exception(*sys.exc_info())}"
+        "Unexpected exception occurred during file manager page execution"
     )
-    dump_index = 0
-    while True:
-        dump_file = f"./GES_echem_gui_dump_{dump_index}.pickle"
-        if os.path.isfile(dump_file):
-            dump_index += 1
-        else:
-            logger.critical(f"Dumping the content of the session state to '{dump_file}'")
-            with open(dump_file, "wb") as file:
-                pickle.dump(dict(st.session_state), file, protocol=pickle.HIGHEST_PROTOCOL)
-            break
+    dump_session_state(logger)
     raise
 
 else:
     logger.debug("-> File manager page run completed succesfully")
+
+    # Save the session checkpoint if the experiments have been modified since the last
+    # save (a new session starts with no experiments and nothing to save). The
+    # fingerprint covers the experiment buffer (the version changes when an experiment
+    # is added, removed, replaced or renamed) and, for each experiment, the properties
+    # edited in this page. The revision changes every time the cycles are rebuilt
+    # (files, ordering, clean and hidden cycles), clean and ordering are also listed
+    # explicitly so that the fingerprint does not rely on that side effect. The
+    # selections and plot settings of the other pages are not covered and are saved
+    # with the next change of the experiments
+    checkpoint_fingerprint = (
+        status.version,
+        tuple(
+            (
+                experiment.revision,
+                experiment.name,
+                experiment.clean,
+                tuple(tuple(level) for level in experiment.ordering),
+                experiment.volume,
+                experiment.area,
+                experiment.color.get_RGB(),
+                experiment._skipped_files,
+            )
+            for experiment in status
+        ),
+    )
+    if st.session_state.get("CheckpointFingerprint", (0, ())) != checkpoint_fingerprint:
+
+        # Serialize the session and leave the file writing to the checkpoint worker
+        try:
+            future = save_checkpoint(st.session_state["CheckpointKey"])
+        except Exception:
+            logger.exception("Failed to save the session checkpoint")
+        else:
+            st.session_state["CheckpointFingerprint"] = checkpoint_fingerprint
+            future.add_done_callback(log_checkpoint_outcome)